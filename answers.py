@@ -8,19 +8,66 @@ To check if the answer to challenge 3 is "kalleankasladrehanka", add
     check(3, "kalleankasladrehanka")
 to the bottom of this file.
 
+To check many candidate answers at once, ex. a word list with one word per line, call `check_many`,
+which returns the correct answers:
+    check_many(3, Path("wordlist.txt"))
+
+To hash the candidates on all CPU cores, pass `workers=None`. Worker processes import this file
+again on Windows, so put that call under `if __name__ == "__main__":` at the bottom of this file.
+
 To redeem a prize, call the 'redeem_prize' function with your username and a list of all the
 challenge answers on the bottom of this file, ex:
 
 redeem_prize("your_username", ["answer1", "answer2", "answer3", ...])
 """
 
+import os
+from collections import deque
 from hashlib import sha256
+from itertools import islice
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 from utils.text_formatting import green, red, yellow
 from utils.utils import encrypt
 
+SHA256_FILEPATH = Path(__file__).parent.joinpath("data/sha256_truncated")
+
+# Number of hex characters of each answer hash stored in `SHA256_FILEPATH`
+HASH_LENGTH = 56
+
+# Default number of candidates hashed per batch by `check_many`
+BATCH_SIZE = 1 << 16
+
+# Cache of the truncated hashes per file, as (modification time, hashes)
+_hash_index: Dict[Path, Tuple[int, List[str]]] = {}
+
+
+def load_hashes(sha256_filepath: Path = SHA256_FILEPATH) -> List[str]:
+    """Load the truncated answer hashes, one per challenge. The hashes are cached in memory, and
+    only read again if the modification time of the file changes.
+
+    :param sha256_filepath: Path to the file with the truncated hashes.
+    :raises FileNotFoundError: If the file does not exist.
+    :returns: List of truncated hashes, where entry 0 is the hash for challenge 1.
+    """
+    mtime = sha256_filepath.stat().st_mtime_ns
+    cached = _hash_index.get(sha256_filepath)
+    if cached is None or cached[0] != mtime:
+        with open(sha256_filepath, 'r') as f:
+            hashes = [line.strip() for line in f if line.strip()]
+        cached = _hash_index[sha256_filepath] = (mtime, hashes)
+
+    return cached[1]
+
+
+def _solution_hash(challenge: int) -> str:
+    hashes = load_hashes()
+    if not 1 <= challenge <= len(hashes):
+        raise ValueError("Invalid challenge number")
+
+    return hashes[challenge - 1]
+
 
 def check(challenge: int, answer: str, _print: bool = True) -> bool:
     """Takes a challenge number and a string containing the answer to check for that challenge,
@@ -31,19 +78,9 @@ def check(challenge: int, answer: str, _print: bool = True) -> bool:
     :param _print: Whether to print the result of the check.
     :returns: Boolean representing if the answer is correct or not.
     """
-    sha256_filepath = Path(__file__).parent.joinpath("data/sha256_truncated")
-    answer_hash = sha256(answer.encode("utf-8")).hexdigest()[:56]
-    solution_hash = None
+    answer_hash = sha256(answer.encode("utf-8")).hexdigest()[:HASH_LENGTH]
     try:
-        with open(sha256_filepath, 'r') as f:
-            for i, line in enumerate(f, start=1):
-                if i == challenge:
-                    solution_hash = line.strip()
-                    break
-
-        if not solution_hash:
-            raise ValueError("Invalid challenge number")
-
+        solution_hash = _solution_hash(challenge)
         if answer_hash == solution_hash:
             if _print:
                 print(green("The answer is correct!"))
@@ -54,56 +91,142 @@ def check(challenge: int, answer: str, _print: bool = True) -> bool:
             return False
 
     except FileNotFoundError:
-        print(yellow(f"The file at {sha256_filepath} could not be found."))
+        print(yellow(f"The file at {SHA256_FILEPATH} could not be found."))
     except ValueError:
         print(yellow(f"The challenge number you provided ({challenge}) does not exist"))
 
     return False
 
 
-def redeem_prize(username: str, answers: List[str]) -> Optional[str]:
+def _match_batch(solution_digest: bytes, batch: List[Union[str, bytes]]) -> List[Union[str, bytes]]:
+    """Get the candidates in `batch` whose truncated hash equals `solution_digest`."""
+    size = len(solution_digest)
+    matches = []
+    for candidate in batch:
+        data = candidate.encode("utf-8") if isinstance(candidate, str) else candidate
+        if sha256(data).digest()[:size] == solution_digest:
+            matches.append(candidate)
+
+    return matches
+
+
+def _read_candidates(candidates_filepath: Union[str, Path]) -> Iterator[bytes]:
+    with open(candidates_filepath, 'rb') as f:
+        for line in f:
+            yield line.rstrip(b"\r\n")
+
+
+def _batches(candidates: Iterable, batch_size: int) -> Iterator[List]:
+    candidates = iter(candidates)
+    while batch := list(islice(candidates, batch_size)):
+        yield batch
+
+
+def check_many(
+    challenge: int,
+    candidates: Union[Iterable[str], str, os.PathLike],
+    workers: Optional[int] = 1,
+    batch_size: int = BATCH_SIZE
+) -> List[str]:
+    """Check many candidate answers for a challenge, ex. a word list, and get the correct ones.
+    Candidates are streamed in batches to a process pool, so the whole list is never in memory.
+
+    :param challenge: Integer corresponding to the challenge to check answers for.
+    :param candidates: Iterable of candidate answers, a single candidate answer, or a path-like
+        object, ex. `Path("wordlist.txt")`, to a file with one candidate per line.
+    :param workers: Number of worker processes, or `None` for the number of CPUs. Defaults to 1,
+        which hashes the candidates in this process. With more than one worker, call this
+        function under `if __name__ == "__main__":`, since worker processes may import the
+        calling module again.
+    :param batch_size: Number of candidates hashed per batch.
+    :returns: List of the correct answers, in the order they were found.
+    """
+    try:
+        solution_hash = _solution_hash(challenge)
+    except FileNotFoundError:
+        print(yellow(f"The file at {SHA256_FILEPATH} could not be found."))
+        return []
+    except ValueError:
+        print(yellow(f"The challenge number you provided ({challenge}) does not exist"))
+        return []
+
+    if isinstance(candidates, os.PathLike):
+        candidates = _read_candidates(candidates)
+    elif isinstance(candidates, str):
+        candidates = [candidates]
+
+    # Compare raw digests instead of hex strings, `HASH_LENGTH` hex characters is half as many bytes
+    solution_digest = bytes.fromhex(solution_hash)
+    matches = []
+    if workers == 1:
+        for batch in _batches(candidates, batch_size):
+            matches.extend(_match_batch(solution_digest, batch))
+    else:
+        # Imported here, since process pools are slow to import and only needed for this function
+        from concurrent.futures import ProcessPoolExecutor
+
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Limit the number of batches in flight, so that candidates are read as they are hashed
+            pending = deque()
+            for batch in _batches(candidates, batch_size):
+                pending.append(executor.submit(_match_batch, solution_digest, batch))
+                if len(pending) >= 2 * workers:
+                    matches.extend(pending.popleft().result())
+
+            while pending:
+                matches.extend(pending.popleft().result())
+
+    return [m.decode("utf-8") if isinstance(m, bytes) else m for m in matches]
+
+
+def redeem_prize(username: str, answers: List[str], _print: bool = True) -> Optional[str]:
     """Redeem a prize for the given username if all the answers in the `answers` list are correct
 
     :param username: Username to redeem a prize for.
     :param answers: List of challenge answers, where the 1st list entry corresponds to the answer
         to challenge 1, the second entry corresponds to the answer to challenge 2, and so on.
+    :param _print: Whether to print the prize, or which answer is incorrect.
     :returns: A prize if all the challenge answers are correct...
     """
-    sha256_filepath = Path(__file__).parent.joinpath("data/sha256_truncated")
     try:
-        with open(sha256_filepath, 'r') as f:
-            num_challenges = sum(1 for _ in f)
-            if len(answers) != num_challenges:
+        solution_hashes = load_hashes()
+    except FileNotFoundError:
+        print(yellow(f"The file at {SHA256_FILEPATH} could not be found."))
+        return
+
+    num_challenges = len(solution_hashes)
+    if len(answers) != num_challenges:
+        print(
+            yellow(
+                f"There are {num_challenges} challenges, but you provided {len(answers)} answers. "
+                f"Please provide one answer for each challenge."
+            )
+        )
+        return
+
+    remainder_hashes = ""
+    for n, solution_hash in enumerate(solution_hashes):
+        answer_full_hash = sha256(answers[n].encode("utf-8")).hexdigest()
+        answer_hash = answer_full_hash[:HASH_LENGTH]
+        remainder_hash = answer_full_hash[HASH_LENGTH:]
+        if answer_hash != solution_hash:
+            if _print:
                 print(
-                    yellow(
-                        f"There are {num_challenges} challenges, but you provided {len(answers)} answers. "
-                        f"Please provide one answer for each challenge."
+                    red(
+                        f"The answer to challenge {n + 1}, '{answers[n]}' is incorrect. "
+                        f"Skipping remaining challenges."
                     )
                 )
-                return
-
-            remainder_hashes = ""
-            f.seek(0)
-            for n, line in enumerate(f):
-                answer_full_hash = sha256(answers[n].encode("utf-8")).hexdigest()
-                answer_hash = answer_full_hash[:56]
-                remainder_hash = answer_full_hash[56:]
-                if answer_hash != line.strip():
-                    print(
-                        red(
-                            f"The answer to challenge {n + 1}, '{answers[n]}' is incorrect. "
-                            f"Skipping remaining challenges."
-                        )
-                    )
-                    return
+            return
 
-                remainder_hashes += remainder_hash
+        remainder_hashes += remainder_hash
 
-            prize = encrypt(username, remainder_hashes)
-            print(f"{prize = }")
+    prize = encrypt(username, remainder_hashes)
+    if _print:
+        print(f"{prize = }")
 
-    except FileNotFoundError:
-        print(yellow(f"The file at {sha256_filepath} could not be found."))
+    return prize
 
 
 # To check if the answer to challenge 3 is "answer3":
@@ -1,35 +1,24 @@
+from utils.rot import rot_text
 
-def rot(in_str: str, n: int) -> str:
+
+def rot(in_str: str, n: int, preserve_case: bool = False) -> str:
     """Rotate each alphabet character in input string
     `in_str` by `n` positions, and output result.
 
     :param in_str: Input string
     :param n: Integer specifying how much to rotate the input string
+    :param preserve_case: Whether to keep upper case letters upper case,
+        instead of converting the whole string to lower case
     :returns: `in_str` rotated by `n` positions
     """
 
-    # Get the ASCII values of 'a' and 'z', and calculate the range of the alphabet (26 in this case)
-    start = ord('a')
-    end = ord('z') + 1
-    mod = end - start
-
-    # Convert `in_str` to lower case
-    in_str = in_str.lower()
-
-    # Create new string to build the string of rotated characters
-    out_str = ''
-    # Loop over all characters in the input string
-    for char in in_str:
-        # Check if the character is a letter
-        if start <= ord(char) < end:
-            # Rotate the character `n` positions and add it to the end of `out_str`
-            out_str += chr(((ord(char) - start + n) % mod) + start)
-        else:
-            # Add non-letter characters to the output string unchanged
-            out_str += char
-
-    # Return the rotated string
-    return out_str
+    # Convert `in_str` to lower case, unless the case should be preserved
+    if not preserve_case:
+        in_str = in_str.lower()
+
+    # Replace every letter with the letter `n` positions later in the alphabet, wrapping around
+    # from 'z' to 'a', using a precomputed translation table. Other characters are unchanged.
+    return rot_text(in_str, n, preserve_case=preserve_case)
 
 
 # This string contains the encrypted solution to this challenge
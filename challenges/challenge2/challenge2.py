@@ -1,6 +1,7 @@
-from itertools import zip_longest
 from pathlib import Path
 
+from utils.interleave import interleave_text
+
 
 def get_file_content(filepath: Path) -> str:
     """Read file at `filepath`, and output the content of the file as a string
@@ -29,8 +30,6 @@ for n, content in enumerate((file1_content, file2_content, file3_content, file4_
 print("")
 
 # Build a string by sequentially adding one character from each file at a time
-output = ""
-for a, b, c, d in zip_longest(file1_content, file2_content, file3_content, file4_content, fillvalue=''):
-    output += f"{a}{b}{c}{d}"
+output = interleave_text((file1_content, file2_content, file3_content, file4_content))
 
 print(f"{output = }")
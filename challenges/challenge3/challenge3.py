@@ -1,30 +1,29 @@
-from typing import Dict
-from string import ascii_lowercase
-from utils.text_formatting import bright_blue
+from typing import Dict, Optional
+from utils.text_formatting import bright_blue, color_runs, write
 
 
-def letter_frequency(string: str, _print=True) -> Dict[str, int]:
+def letter_frequency(string: str, _print=True, top: Optional[int] = None) -> Dict[str, int]:
     """Given an input string, generate a dictionary containing
     a mapping of the letter frequency in the string, and print
     the mapping to the console if `_print` is True.
 
+    For bigrams, trigrams, doubled letters and the index of coincidence,
+    see `utils.frequency`.
+
     :param string: Input string.
     :param _print: Whether to print the mapping to the console.
+    :param top: Only print the `top` most frequent letters.
     :returns: Dictionary of letter frequency in input string.
     """
-    mapping = {}
-    for char in string:
-        char = char.lower()
-        if char not in ascii_lowercase:
-            continue
-        elif char not in mapping:
-            mapping[char] = 1
-        else:
-            mapping[char] += 1
+    # Imported here, since NumPy is slow to import
+    from utils.frequency import count_text
+
+    counts = count_text(string)
+    mapping = counts.unigram_dict()
 
     if _print:
         print("Ciphertext letter frequency:")
-        for k, v in sorted(mapping.items(), key=lambda x: x[1], reverse=True):
+        for k, v in counts.most_common(1, top):
             print(f"{k}: {v}")
 
     return mapping
@@ -54,22 +53,17 @@ def replace(string: str, mapping: dict, _print=True, color: callable = bright_bl
     :returns: Mapped string
     """
 
-    # Default no-operation function to replace `color` if it's set to None
-    def noop(text: str) -> str: return text
-
-    if not color:
-        color = noop
-
-    output = ""
-    for char in string:
-        char = char.lower()
-        if char in mapping.keys():
-            output += color(text=mapping[char])
-        else:
-            output += char
+    # Characters are replaced with a translation table. Only single characters can be replaced.
+    mapping = {k: v for k, v in mapping.items() if len(k) == 1}
+    string = string.lower()
+    if color:
+        # Color each run of replaced characters with one escape sequence
+        output = color_runs(string, mapping.keys(), color=color, table=str.maketrans(mapping))
+    else:
+        output = string.translate(str.maketrans(mapping))
 
     if _print:
-        print("Decrypted:\n ", output)
+        write("Decrypted:\n ", output)
 
     return output
 
@@ -94,3 +88,8 @@ char_map = {
 }
 
 replace(string=ciphertext, mapping=char_map)
+
+# To find `char_map` automatically, with a quadgram hill climbing solver:
+# from utils.substitution import solve
+# char_map, score = solve(ciphertext)
+# replace(string=ciphertext, mapping=char_map)
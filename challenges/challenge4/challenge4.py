@@ -1,28 +1,63 @@
 from pathlib import Path
-
-import librosa
-import matplotlib.pyplot as plt
-import numpy as np
+from typing import Optional
 
 from utils.utils import handle_file
 
 
-def show_spectrogram(soundfile: str) -> None:
+def show_spectrogram(
+    soundfile: str,
+    n_fft: int = 2048,
+    hop_length: int = 512,
+    sample_rate: Optional[int] = None,
+    time_decimation: int = 1
+) -> None:
     """Display a spectrogram of the soundfile using a matplotlib plot
 
     :param soundfile: String containing a soundfile name or path to a sound file.
+    :param n_fft: Length of the window used for each column of the spectrogram.
+    :param hop_length: Number of samples between each column of the spectrogram.
+    :param sample_rate: Sample rate to resample the sound file to. Uses the
+        sample rate of the sound file by default.
+    :param time_decimation: Combine every `time_decimation` columns of the
+        spectrogram into one, for long sound files.
     """
     soundfile = handle_file(file=soundfile, python_module=Path(__file__))
     if soundfile is None:
         return
 
-    data, samplerate = librosa.load(soundfile)
-
-    data_stft = librosa.stft(data)
-    s_db = librosa.amplitude_to_db(np.abs(data_stft), ref=np.max)
+    # Heavy dependencies are imported here instead of at the top, to keep importing this module fast
+    import librosa
+    import matplotlib.pyplot as plt
+    import numpy as np
+
+    from utils.spectrogram import spectrogram
+    from utils.wav import read_wav_info
+
+    try:
+        read_wav_info(soundfile)
+        streamable = True
+    except ValueError:
+        streamable = False
+
+    if streamable:
+        # PCM WAV files are streamed in chunks, see `utils.spectrogram`
+        s_db, samplerate, hop_length = spectrogram(
+            soundfile,
+            n_fft=n_fft,
+            hop_length=hop_length,
+            sample_rate=sample_rate,
+            time_decimation=time_decimation
+        )
+    else:
+        # Other formats are decoded in memory by librosa
+        data, samplerate = librosa.load(soundfile, sr=sample_rate)
+        data_stft = librosa.stft(data, n_fft=n_fft, hop_length=hop_length)
+        s_db = librosa.amplitude_to_db(np.abs(data_stft), ref=np.max)
 
     fig, ax = plt.subplots()
-    img = librosa.display.specshow(s_db, x_axis="time", y_axis="linear", ax=ax)
+    img = librosa.display.specshow(
+        s_db, sr=samplerate, n_fft=n_fft, hop_length=hop_length, x_axis="time", y_axis="linear", ax=ax
+    )
     ax.set(title="Spectrogram")
     fig.colorbar(img, ax=ax, format="%+2.f dB")
     plt.show()
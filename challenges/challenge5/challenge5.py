@@ -1,62 +1,98 @@
+import mmap
 from io import BytesIO
 from math import isqrt
 from pathlib import Path
-from typing import List, Optional, Tuple, Type, Union
-
-import PIL
-from PIL import Image
+from typing import TYPE_CHECKING, List, Optional, Tuple, Type, Union
 
 from utils.text_formatting import green, yellow
-from utils.utils import handle_file, lsb_bits_to_string
+from utils.utils import handle_file, lsb_bits_to_string, string_to_lsb_bits, unpack_bits
+
+if TYPE_CHECKING:
+    # NumPy and PIL are imported in the functions that use them, to keep importing this module fast
+    import numpy as np
 
 
 def normalized_image(
-    decoded_data: List[int],
+    decoded_data: Union[List[int], "np.ndarray", bytes, bytearray, memoryview],
     out_file: str = "normalized_image.png",
-    dimensions: Tuple[int] = None
+    dimensions: Tuple[int] = None,
+    mode: str = "RGB",
+    image_format: str = "png",
+    compress_level: int = 6
 ) -> bool:
     """Create a normalized image from the input `decoded_data` list,
     write the result to a file, and return a bool representing whether
     the operation was successful.
 
-    :param decoded_data: List of ints to use in the normalized image.
-        The length of the list must be a square number when
-        `dimensions` is not provided.
+    :param decoded_data: List or array of ints to use in the normalized
+        image, or bytes of packed bits (see `unpack_bits`). The number
+        of values must be a square number when `dimensions` is not
+        provided.
     :param out_file: Filename of the image file to write to.
     :param dimensions: Tuple representing the dimensions of the
         `out_file` image in the format (width, height). If no
         dimensions are provided, it will be set to the square root of
         the length of the `decoded_data` list.
+    :param mode: Image mode of the output image. Either "RGB", "L"
+        (grayscale) or "1" (one bit per pixel).
+    :param image_format: Either "png", or "raw" to write the uncompressed
+        pixel buffer row by row.
+    :param compress_level: PNG compression level from 0 (fastest) to 9
+        (smallest file).
     :returns: Bool representing whether the operation was successful.
     """
-    if not isinstance(decoded_data, list):
-        print(yellow(f"`decoded_data` must be of type `list`, got type {type(decoded_data)}"))
+    import numpy as np
+    from PIL import Image
+
+    if not isinstance(decoded_data, (list, np.ndarray, bytes, bytearray, memoryview)):
+        print(
+            yellow(
+                f"`decoded_data` must be of type `list`, `np.ndarray` or `bytes`, got type {type(decoded_data)}"
+            )
+        )
+        return False
+
+    if mode not in ("RGB", "L", "1") or image_format not in ("png", "raw"):
+        print(yellow(f"Unsupported output {mode = }, {image_format = }"))
         return False
 
+    if isinstance(decoded_data, (bytes, bytearray, memoryview)):
+        values = unpack_bits(data=decoded_data)
+    else:
+        values = np.asarray(decoded_data)
     if not dimensions:
-        # Get the largest integer, `size`, where `size` squared does not exceed `len(decoded_data)`
-        size = isqrt(len(decoded_data))
+        # Get the largest integer, `size`, where `size` squared does not exceed `len(values)`
+        size = isqrt(len(values))
         dimensions = (size, size)
-        if size ** 2 != len(decoded_data):
+        if size ** 2 != len(values):
             print(
                 yellow(
                     f"The length of `decoded_data` must be a square number when `dimensions` "
-                    f"is not provided. Got {len(decoded_data) = }"
+                    f"is not provided. Got {len(values) = }"
                 )
             )
             return False
 
         print(f"Using output dimensions {dimensions}")
 
-    i = 0
-    out_image = Image.new(mode="RGB", size=dimensions)
-    for x in range(dimensions[0]):
-        for y in range(dimensions[1]):
-            pixel = (255, 255, 255) if decoded_data[i] else (0, 0, 0)
-            out_image.putpixel((x, y), pixel)
-            i += 1
+    width, height = dimensions
+    if len(values) < width * height:
+        print(yellow(f"`decoded_data` has {len(values)} values, but {dimensions = } needs {width * height}"))
+        return False
+
+    # The values fill the image column by column, (0, 0), (0, 1), ..., so reshape to (width, height)
+    # and transpose to the (height, width) layout of image buffers
+    pixels = values[:width * height].reshape(width, height).T != 0
+    if mode == "1":
+        out_image = Image.fromarray(pixels)
+    else:
+        out_image = Image.fromarray(pixels.astype(np.uint8) * 255).convert(mode)
 
-    out_image.save(out_file, "png")
+    if image_format == "raw":
+        with open(out_file, "wb") as f:
+            f.write(out_image.tobytes())
+    else:
+        out_image.save(out_file, "png", compress_level=compress_level)
 
     return True
 
@@ -66,8 +102,9 @@ def read_image_lsb_data(
     channel: int = 0,
     start: int = 0,
     stop: Optional[int] = None,
-    return_type: Union[Type[str], Type[list]] = str
-) -> Optional[Union[str, list]]:
+    return_type: Union[Type[str], Type[list], Type[bytes]] = str,
+    with_bit_count: bool = False
+) -> Optional[Union[str, list, bytes, Tuple[bytes, int]]]:
     """Attempt to read LSB data from input file.
 
     :param filename: Name of the image file to read LSB data from.
@@ -78,17 +115,26 @@ def read_image_lsb_data(
     :param stop: Position to stop reading at. Reads to the end
         of the image file by default.
     :param return_type: What type to return the image LSB data in.
-        Either as a string of bits or a list of bits.
-    :returns: Retrieved decoded bits, either as a string or list,
-        or `None` on failure.
+        Either as a decoded string, a list of bits, or bytes of packed
+        bits (8 bits per byte, zero-padded at the end).
+    :param with_bit_count: Whether to also return the number of bits
+        read, when `return_type` is bytes, since the zero padding of
+        the last byte is not part of the data, ex:
+
+            data, bit_count = read_image_lsb_data(filename, return_type=bytes, with_bit_count=True)
+            lsb_bits_to_string(data, bit_count=bit_count)
+
+    :returns: Retrieved decoded bits, either as a string, list or bytes,
+        a tuple of (bytes, number of bits) with `with_bit_count`, or
+        `None` on failure.
     """
     image_file = handle_file(file=filename, python_module=Path(__file__))
     if not image_file:
         # Could not find file `filename`
         return
 
-    if return_type not in (str, list):
-        print(yellow(f"The return_type must be set to either 'str' or 'list'. Got '{return_type}'"))
+    if return_type not in (str, list, bytes):
+        print(yellow(f"The return_type must be set to either 'str', 'list' or 'bytes'. Got '{return_type}'"))
         return
 
     channel_map = {
@@ -102,31 +148,80 @@ def read_image_lsb_data(
     else:
         print(f"Extracting data from the {channel_map[channel]} color channel")
 
-    i = 0
-    lsb_bits = []
-    done = False
-    with Image.open(image_file) as img:
-        width, height = img.size
-        for x in range(width):
-            if done:
-                break
-
-            for y in range(height):
-                if done:
-                    break
+    import numpy as np
+    from utils.stego import read_lsb_window
 
-                if start <= i:
-                    pixel = list(img.getpixel(xy=(x, y)))
-                    lsb_bits.append(pixel[channel] & 1)
-
-                i += 1
-                if stop and i >= stop:
-                    done = True
+    try:
+        # Only the pixel columns covering [start, stop) are read, see `read_lsb_window`
+        lsb_bits = read_lsb_window(filename=str(image_file), channel=channel, start=start, stop=stop)
+    except ValueError as e:
+        print(yellow(str(e)))
+        return
 
     if return_type is str:
         return lsb_bits_to_string(data=lsb_bits)
     elif return_type is list:
-        return lsb_bits
+        return lsb_bits.tolist()
+    elif return_type is bytes:
+        data = np.packbits(lsb_bits).tobytes()
+        return (data, len(lsb_bits)) if with_bit_count else data
+
+
+def write_image_lsb_data(
+    filename: str,
+    data: Union[str, bytes, bytearray, memoryview],
+    out_file: str = "lsb_image.png",
+    channel: int = 0,
+    start: int = 0,
+    char_size: int = 8,
+    compress_level: int = 6
+) -> bool:
+    """Write LSB data into an image, such that `read_image_lsb_data`
+    with the same `channel` and `start` reads it back. The pixels are
+    written column by column, (0, 0), (0, 1), ..., see
+    `utils.stego.embed_stream`.
+
+    :param filename: Name of the image file to write LSB data into.
+    :param data: Either a string, encoded with `char_size` bits per char
+        (see `string_to_lsb_bits`), or bytes of packed bits.
+    :param out_file: Filename of the PNG file to write to. Lossy formats
+        would destroy the written bits.
+    :param channel: Which color channel to write data to.
+        0 = Red, 1 = Green, 2 = Blue.
+    :param start: Position to start writing at.
+    :param char_size: number of bits used for representing a char, when
+        `data` is a string. Default size is 8 bits per char.
+    :param compress_level: PNG compression level from 0 (fastest) to 9
+        (smallest file).
+    :returns: Bool representing whether the operation was successful.
+    """
+    image_file = handle_file(file=filename, python_module=Path(__file__))
+    if not image_file:
+        # Could not find file `filename`
+        return False
+
+    if channel not in (0, 1, 2):
+        print(yellow(f"Invalid channel '{channel}'. Must be one of: '[0, 1, 2]'."))
+        return False
+
+    import numpy as np
+    from PIL import Image
+    from utils.stego import embed_stream
+
+    with Image.open(image_file) as img:
+        # Keep an alpha channel, other modes are written as RGB
+        pixels = np.array(img.convert("RGBA" if "A" in img.getbands() else "RGB"))
+
+    try:
+        bits = string_to_lsb_bits(string=data, char_size=char_size) if isinstance(data, str) else data
+        stop = embed_stream(pixels, bits, channels=(channel,), start=start)
+    except ValueError as e:
+        print(yellow(str(e)))
+        return False
+
+    Image.fromarray(pixels).save(out_file, "png", compress_level=compress_level)
+    print(green(f"Wrote LSB data to bits [{start}, {stop}) of '{out_file}'."))
+    return True
 
 
 def extract_jpg_data(jpg_filename: str, out_file: str = "embedded.png", byte_position: str = 'FFD8') -> None:
@@ -137,19 +232,34 @@ def extract_jpg_data(jpg_filename: str, out_file: str = "embedded.png", byte_pos
     :param out_file: File to save extracted data to.
     :param byte_position: Start reading data after these bytes in the jpg file.
     :returns: None
+
+    To find every embedded file at once, see `utils.carve.carve`.
     """
     jpg_file = handle_file(file=jpg_filename, python_module=Path(__file__))
     if not jpg_file:
         # Could not find file `jpg_filename`
         return
 
+    import PIL
+    from PIL import Image
+
+    marker = bytes.fromhex(byte_position)
     try:
-        with open(jpg_filename, "rb") as f:
-            content = f.read()
-            offset = content.index(bytes.fromhex(byte_position))
-            f.seek(offset + 2)
-            new_img = Image.open(BytesIO(f.read()))
-            new_img.save(out_file)
+        with open(jpg_file, "rb") as f:
+            # Empty files cannot be memory-mapped, and contain no marker
+            if not f.seek(0, 2):
+                print(yellow(f"Could not find the bytes '{byte_position}' in jpg file."))
+                return
+
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                offset = mm.find(marker)
+                if offset < 0:
+                    print(yellow(f"Could not find the bytes '{byte_position}' in jpg file."))
+                    return
+
+                # Only the data after the marker is copied out of the memory map
+                new_img = Image.open(BytesIO(mm[offset + len(marker):]))
+                new_img.save(out_file)
     except PIL.UnidentifiedImageError:
         print(yellow(f"Unable to extract data from byte position '{byte_position}' in jpg file."))
         return
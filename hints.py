@@ -10,10 +10,140 @@ To get the third hint for challenge 2, add:
 """
 
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
 from utils.text_formatting import red, yellow
 from utils.utils import encrypt, lfsr
 
+if TYPE_CHECKING:
+    # NumPy is imported where it is used, to keep importing this module fast
+    import numpy as np
+
+HINT_FILEPATH = Path(__file__).parent.joinpath("data/hint_data")
+
+# Cache of the parsed hint data per file, as (modification time, encrypted hints)
+_hint_store: Dict[Path, Tuple[int, Dict[Tuple[int, int], str]]] = {}
+
+# Cache of the keystream codes per (challenge number, hint number)
+_keystreams: Dict[Tuple[int, int], "np.ndarray"] = {}
+
+
+def read_hint_data(hint_filepath: Path = HINT_FILEPATH) -> Dict[Tuple[int, int], str]:
+    """Read all encrypted hints from the hint data file.
+
+    :param hint_filepath: Path to the hint data file.
+    :raises FileNotFoundError: If the file does not exist.
+    :returns: Dict mapping (challenge number, hint number) to the encrypted hint.
+    """
+    encrypted_hints = {}
+    with open(hint_filepath, 'r') as f:
+        lines = (line.strip() for line in f)
+        for line in lines:
+            if line.startswith('c') and 'h' in line:
+                challenge_num, _, hint_num = line[1:].partition('h')
+                if challenge_num.isdigit() and hint_num.isdigit():
+                    encrypted_hints[int(challenge_num), int(hint_num)] = next(lines, '')
+
+    return encrypted_hints
+
+
+def load_hints(hint_filepath: Path = HINT_FILEPATH) -> Dict[Tuple[int, int], str]:
+    """Get all encrypted hints, see `read_hint_data`. The hints are cached in memory, and only
+    read again if the modification time of the file changes.
+
+    :param hint_filepath: Path to the hint data file.
+    :raises FileNotFoundError: If the file does not exist.
+    :returns: Dict mapping (challenge number, hint number) to the encrypted hint.
+    """
+    mtime = hint_filepath.stat().st_mtime_ns
+    cached = _hint_store.get(hint_filepath)
+    if cached is None or cached[0] != mtime:
+        cached = _hint_store[hint_filepath] = (mtime, read_hint_data(hint_filepath))
+
+    return cached[1]
+
+
+def hint_kwargs(challenge_num: int, hint_num: int) -> Dict[str, int]:
+    """Get the `lfsr` keyword arguments of the keystream for a hint.
+
+    :param challenge_num: The challenge the hint belongs to.
+    :param hint_num: The number of the hint.
+    :returns: Dict with the seed and mask of the keystream.
+    """
+    return {
+        "seed": challenge_num * 1337,
+        "mask": hint_num * 9001
+    }
+
+
+def hint_keystream(challenge_num: int, hint_num: int, length: int) -> "np.ndarray":
+    """Get the first `length` key codes of the keystream for a hint. Keystreams are cached,
+    and only generated again if a longer keystream is needed.
+
+    :param challenge_num: The challenge the hint belongs to.
+    :param hint_num: The number of the hint.
+    :param length: Number of key codes to get.
+    :returns: Array of base64 character codes.
+    """
+    from utils.cipher import Keystream
+
+    codes = _keystreams.get((challenge_num, hint_num))
+    if codes is None or len(codes) < length:
+        keystream = Keystream(keystream=lfsr, keystream_kwargs=hint_kwargs(challenge_num, hint_num))
+        codes = _keystreams[challenge_num, hint_num] = keystream.take(length)
+
+    return codes[:length]
+
+
+def hints_all(hint_filepath: Path = HINT_FILEPATH) -> Dict[Tuple[int, int], str]:
+    """Decrypt all hints at once. The hints are joined into one buffer, and decrypted with the
+    joined keystreams in one vectorized pass.
+
+    :param hint_filepath: Path to the hint data file.
+    :raises FileNotFoundError: If the file does not exist.
+    :returns: Dict mapping (challenge number, hint number) to the decrypted hint.
+    """
+    import numpy as np
+
+    from utils.cipher import CHR_TABLE, INVALID, ORD_TABLE
+
+    encrypted_hints = load_hints(hint_filepath)
+    buffers = [np.frombuffer(h.encode("utf-8"), dtype=np.uint8) for h in encrypted_hints.values()]
+    if not buffers:
+        return {}
+
+    codes = [ORD_TABLE[b] for b in buffers]
+    keystream = np.concatenate([
+        hint_keystream(challenge_num, hint_num, int(np.count_nonzero(c != INVALID)))
+        for (challenge_num, hint_num), c in zip(encrypted_hints, codes)
+    ])
+
+    buffer = np.concatenate(buffers)
+    codes = np.concatenate(codes)
+    in_alphabet = codes != INVALID
+    buffer[in_alphabet] = CHR_TABLE[codes[in_alphabet] ^ keystream]
+
+    ends = np.cumsum([len(b) for b in buffers]).tolist()
+    data = buffer.tobytes()
+    return {
+        key: data[start:end].decode("utf-8")
+        for key, start, end in zip(encrypted_hints, [0] + ends, ends)
+    }
+
+
+def decrypt_hint(challenge_num: int, hint_num: int, encrypted_hint: str) -> str:
+    """Decrypt the hint `hint_num` for challenge `challenge_num`.
+
+    :param challenge_num: The challenge the hint belongs to.
+    :param hint_num: The number of the hint.
+    :param encrypted_hint: The encrypted hint, as stored in the hint data file.
+    :returns: The decrypted hint.
+    """
+    return encrypt(
+        text=encrypted_hint,
+        keystream=lfsr,
+        keystream_kwargs=hint_kwargs(challenge_num, hint_num)
+    )
+
 
 def hint(challenge_num: int, hint_num: int = 1, _print: bool = True) -> Optional[str]:
     """Get a hint for the challenge `challenge_num`.
@@ -28,44 +158,25 @@ def hint(challenge_num: int, hint_num: int = 1, _print: bool = True) -> Optional
         print(red(f"Invalid challenge number: {challenge_num}"))
         return
 
-    hint_filepath = Path(__file__).parent.joinpath("data/hint_data")
     encrypted_hint = None
     try:
-        with open(hint_filepath, 'r') as f:
-            line = f.readline()
-            while line != '':
-                line = line.strip()
-                if line.startswith('#'):
-                    line = f.readline()
-                    continue
-
-                if line == f"c{challenge_num}h{hint_num}":
-                    encrypted_hint = f.readline().strip()
-                    break
-
-                line = f.readline()
-
+        encrypted_hint = load_hints().get((challenge_num, hint_num))
     except FileNotFoundError:
-        print(yellow(f"The file at {hint_filepath} could not be found."))
+        print(yellow(f"The file at {HINT_FILEPATH} could not be found."))
 
     if encrypted_hint is None:
         if _print:
             print(yellow(f"Could not find hint {hint_num} for challenge {challenge_num}."))
-            return
+        return
 
-    output = encrypt(
-        text=encrypted_hint,
-        keystream=lfsr,
-        keystream_kwargs={
-            "seed": challenge_num * 1337,
-            "mask": hint_num * 9001
-        }
-    )
+    output = decrypt_hint(challenge_num, hint_num, encrypted_hint)
 
     if _print:
         print(f"Challenge {challenge_num} hint {hint_num}:")
         print(output)
 
+    return output
+
 
 # To get the first hint for challenge 2:
 # hint(2, 1)
@@ -0,0 +1,41 @@
+import io
+import zipfile
+
+from utils.carve import find_files
+
+
+def _zip_bytes(entries: int) -> bytes:
+    data = io.BytesIO()
+    with zipfile.ZipFile(data, "w") as zf:
+        for i in range(entries):
+            zf.writestr(f"file{i}.txt", f"entry {i} ".encode() * 100)
+
+    return data.getvalue()
+
+
+def test_zip_in_junk_is_carved_once():
+    archive = _zip_bytes(5)
+    buffer = b"\x00" * 400 + archive + b"junk" * 100
+
+    assert list(find_files(buffer)) == [("zip", 400, 400 + len(archive))]
+    with zipfile.ZipFile(io.BytesIO(buffer[400:400 + len(archive)])) as zf:
+        assert zf.testzip() is None
+        assert len(zf.namelist()) == 5
+
+
+def test_consecutive_zips_are_carved_separately():
+    first, second = _zip_bytes(3), _zip_bytes(2)
+    buffer = b"junk" + first + b"junk" + second
+
+    assert list(find_files(buffer)) == [
+        ("zip", 4, 4 + len(first)),
+        ("zip", 8 + len(first), 8 + len(first) + len(second)),
+    ]
+
+
+def test_whole_file_is_skipped_and_scanned_inside():
+    archive = _zip_bytes(2)
+    buffer = b"%PDF-1.4 " + archive + b" %%EOF"
+
+    assert list(find_files(buffer)) == [("pdf", 0, len(buffer))]
+    assert list(find_files(buffer, skip_whole=True)) == [("zip", 9, 9 + len(archive))]
@@ -0,0 +1,37 @@
+import wave
+
+import librosa
+import numpy as np
+import pytest
+
+from utils.spectrogram import spectrogram
+
+
+def _write_wav(path, n_frames: int, sample_rate: int = 8000) -> np.ndarray:
+    rng = np.random.default_rng(n_frames)
+    samples = (rng.standard_normal(n_frames) * 3000).astype("<i2")
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(samples.tobytes())
+
+    return samples.astype(np.float32) / 32768
+
+
+@pytest.mark.parametrize("n_frames, chunk_frames", [
+    (500, 1 << 16),
+    (65546, 1 << 16),
+    (20001, 1000),
+    (20001, 3),
+])
+def test_spectrogram_matches_librosa(tmp_path, n_frames, chunk_frames):
+    path = tmp_path / "short.wav"
+    y = _write_wav(path, n_frames)
+
+    s_db, sample_rate, hop_length = spectrogram(path, chunk_frames=chunk_frames)
+    expected = librosa.amplitude_to_db(np.abs(librosa.stft(y)), ref=np.max)
+
+    assert (sample_rate, hop_length) == (8000, 512)
+    assert s_db.shape == expected.shape
+    assert np.abs(s_db - expected).max() < 1e-2
@@ -0,0 +1,315 @@
+"""
+Carve embedded files out of arbitrary data, ex. an image appended to a JPEG file.
+
+Input files are memory-mapped and scanned once for the signatures of all supported formats.
+The end of each object is found by walking the structure of its format, and every object is
+written to disk straight from the memory map. Run as a script to carve files or directories:
+
+    python -m utils.carve challenges/challenge5/nothing_to_see_here.jpg --out carved
+"""
+
+import mmap
+import re
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from functools import partial
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+# File signatures of the supported formats
+FILE_SIGNATURES = {
+    "png": b"\x89PNG\r\n\x1a\n",
+    "jpg": b"\xff\xd8\xff",
+    "gif": b"GIF8",
+    "zip": b"PK\x03\x04",
+    "pdf": b"%PDF",
+    "wav": b"RIFF",
+}
+
+_SIGNATURE_PATTERN = re.compile(b"|".join(re.escape(magic) for magic in FILE_SIGNATURES.values()))
+_KIND_BY_PREFIX = {magic[:3]: kind for kind, magic in FILE_SIGNATURES.items()}
+
+# An 0xFF byte followed by a JPEG marker, i.e. not a stuffed byte (FF00), restart marker (FFD0-FFD7) or fill byte
+_JPEG_MARKER = re.compile(b"\\xff[^\\x00\\xd0-\\xd7\\xff]")
+
+Buffer = Union[bytes, mmap.mmap]
+
+# Maps an end marker to the (offset searched from, offset found or -1) of its last search
+MarkerCache = Dict[bytes, Tuple[int, int]]
+
+
+class CarvedFile(NamedTuple):
+    """A file carved out of another file.
+
+    :param kind: Format of the carved file, one of the keys in `FILE_SIGNATURES`.
+    :param start: Offset of the first byte in the source file.
+    :param end: Offset after the last byte in the source file.
+    :param path: Where the carved file was written, or `None` if it was not written.
+    """
+    kind: str
+    start: int
+    end: int
+    path: Optional[Path]
+
+
+def _uint(buffer: Buffer, start: int, size: int, byteorder: str) -> Optional[int]:
+    data = buffer[start:start + size]
+    return int.from_bytes(data, byteorder) if len(data) == size else None
+
+
+def _find_marker(buffer: Buffer, marker: bytes, start: int, markers: Optional[MarkerCache] = None) -> int:
+    """Find the first `marker` at or after `start`, like `buffer.find`. With a cache, a search
+    from a later offset reuses the last result while it is still ahead, so the bytes of the
+    buffer are only searched once per marker."""
+    if markers is not None and marker in markers:
+        origin, found = markers[marker]
+        if origin <= start and (found < 0 or found >= start):
+            return found
+
+    found = buffer.find(marker, start)
+    if markers is not None:
+        markers[marker] = (start, found)
+
+    return found
+
+
+def jpg_end(buffer: Buffer, start: int) -> Optional[int]:
+    """Walk the marker segments of a JPEG file, and find the end of the EOI (FFD9) marker.
+    Entropy-coded data after each SOS (FFDA) marker is skipped, so FFD9 bytes in segment
+    payloads and thumbnails do not end the file early.
+
+    :param buffer: Data containing the file.
+    :param start: Offset of the SOI (FFD8) marker.
+    :returns: Offset after the end of the file, or `None` if the structure is invalid.
+    """
+    pos = start + 2
+    while pos + 2 <= len(buffer):
+        if buffer[pos] != 0xFF:
+            return None
+
+        marker = buffer[pos + 1]
+        if marker == 0xFF:
+            pos += 1
+        elif marker == 0xD9:
+            return pos + 2
+        elif 0xD0 <= marker <= 0xD7 or marker == 0x01:
+            pos += 2
+        else:
+            length = _uint(buffer, pos + 2, 2, "big")
+            if length is None or length < 2:
+                return None
+
+            pos += 2 + length
+            if marker == 0xDA:
+                match = _JPEG_MARKER.search(buffer, pos)
+                if match is None:
+                    return None
+                pos = match.start()
+
+    return None
+
+
+def png_end(buffer: Buffer, start: int) -> Optional[int]:
+    """Walk the chunks of a PNG file until the IEND chunk.
+
+    :param buffer: Data containing the file.
+    :param start: Offset of the PNG signature.
+    :returns: Offset after the end of the file, or `None` if the structure is invalid.
+    """
+    pos = start + 8
+    while True:
+        length = _uint(buffer, pos, 4, "big")
+        if length is None or length >= 1 << 31:
+            return None
+
+        chunk_type = buffer[pos + 4:pos + 8]
+        pos += 12 + length
+        if pos > len(buffer):
+            return None
+        elif chunk_type == b"IEND":
+            return pos
+
+
+def gif_end(buffer: Buffer, start: int) -> Optional[int]:
+    """Walk the blocks of a GIF file until the trailer byte.
+
+    :param buffer: Data containing the file.
+    :param start: Offset of the GIF signature.
+    :returns: Offset after the end of the file, or `None` if the structure is invalid.
+    """
+    def skip_color_table(pos: int, flags: int) -> int:
+        return pos + ((3 << ((flags & 0x07) + 1)) if flags & 0x80 else 0)
+
+    def skip_sub_blocks(pos: int) -> Optional[int]:
+        while pos < len(buffer):
+            size = buffer[pos]
+            pos += 1 + size
+            if not size:
+                return pos
+
+        return None
+
+    if buffer[start:start + 6] not in (b"GIF87a", b"GIF89a") or len(buffer) < start + 13:
+        return None
+
+    pos = skip_color_table(start + 13, buffer[start + 10])
+    while pos is not None and pos < len(buffer):
+        block = buffer[pos]
+        if block == 0x3B:
+            return pos + 1
+        elif block == 0x21:
+            pos = skip_sub_blocks(pos + 2)
+        elif block == 0x2C and pos + 10 <= len(buffer):
+            pos = skip_sub_blocks(skip_color_table(pos + 10, buffer[pos + 9]) + 1)
+        else:
+            return None
+
+    return None
+
+
+def zip_end(buffer: Buffer, start: int, markers: Optional[MarkerCache] = None) -> Optional[int]:
+    """Find the end of the end of central directory record of a ZIP file.
+
+    :param buffer: Data containing the file.
+    :param start: Offset of the first local file header.
+    :param markers: Cache of earlier searches in the same buffer, see `find_files`.
+    :returns: Offset after the end of the file, or `None` if no record is found.
+    """
+    record = _find_marker(buffer, b"PK\x05\x06", start, markers)
+    comment_length = _uint(buffer, record + 20, 2, "little") if record >= 0 else None
+    return None if comment_length is None else min(record + 22 + comment_length, len(buffer))
+
+
+def pdf_end(buffer: Buffer, start: int, markers: Optional[MarkerCache] = None) -> Optional[int]:
+    """Find the first end-of-file marker of a PDF file.
+
+    :param buffer: Data containing the file.
+    :param start: Offset of the PDF header.
+    :param markers: Cache of earlier searches in the same buffer, see `find_files`.
+    :returns: Offset after the end of the file, or `None` if no marker is found.
+    """
+    marker = _find_marker(buffer, b"%%EOF", start, markers)
+    if marker < 0:
+        return None
+
+    end = marker + 5
+    while end < len(buffer) and buffer[end] in b"\r\n":
+        end += 1
+
+    return end
+
+
+def wav_end(buffer: Buffer, start: int) -> Optional[int]:
+    """Get the end of a WAV file from the size in its RIFF header.
+
+    :param buffer: Data containing the file.
+    :param start: Offset of the RIFF header.
+    :returns: Offset after the end of the file, or `None` if the header is invalid.
+    """
+    size = _uint(buffer, start + 4, 4, "little")
+    if size is None or buffer[start + 8:start + 12] != b"WAVE" or start + 8 + size > len(buffer):
+        return None
+
+    return start + 8 + size
+
+
+FILE_END_FINDERS: Dict[str, Callable[[Buffer, int], Optional[int]]] = {
+    "png": png_end,
+    "jpg": jpg_end,
+    "gif": gif_end,
+    "zip": zip_end,
+    "pdf": pdf_end,
+    "wav": wav_end,
+}
+
+
+def find_files(buffer: Buffer, skip_whole: bool = False) -> Iterator[Tuple[str, int, int]]:
+    """Scan the buffer once for all file signatures, and find the end of each file. Scanning
+    resumes after the end of each file found, so signatures inside it, ex. the local file
+    headers of a ZIP file, do not start new files.
+
+    :param buffer: Data to scan.
+    :param skip_whole: Whether to skip a file spanning the whole buffer, and scan inside it instead.
+    :yields: Tuples of (kind, start, end) for each file with a valid structure.
+    """
+    markers: MarkerCache = {}
+    end_finders = {**FILE_END_FINDERS, "zip": partial(zip_end, markers=markers), "pdf": partial(pdf_end, markers=markers)}
+    pos = 0
+    while match := _SIGNATURE_PATTERN.search(buffer, pos):
+        kind = _KIND_BY_PREFIX[match.group()[:3]]
+        end = end_finders[kind](buffer, match.start())
+        if end is None or (skip_whole and (match.start(), end) == (0, len(buffer))):
+            pos = match.start() + 1
+            continue
+
+        yield kind, match.start(), end
+        pos = end
+
+
+def carve(
+    filename: Union[str, Path],
+    out_dir: Optional[Union[str, Path]] = None,
+    skip_whole: bool = True
+) -> List[CarvedFile]:
+    """Find all embedded files in `filename`, and write each one to `out_dir`.
+
+    :param filename: Path to the file to carve.
+    :param out_dir: Directory to write carved files to, named `<file stem>_<start offset>.<kind>`.
+        Carved files are only listed if `out_dir` is `None`.
+    :param skip_whole: Whether to skip a carved file spanning the whole input.
+    :returns: List of carved files.
+    """
+    filename = Path(filename)
+    carved = []
+    with open(filename, "rb") as f:
+        if not f.seek(0, 2):
+            return carved
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for kind, start, end in find_files(mm, skip_whole=skip_whole):
+                path = None
+                if out_dir is not None:
+                    path = Path(out_dir).joinpath(f"{filename.stem}_{start:x}.{kind}")
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    with open(path, "wb") as out, memoryview(mm) as view, view[start:end] as data:
+                        out.write(data)
+
+                carved.append(CarvedFile(kind, start, end, path))
+
+    return carved
+
+
+def carve_all(
+    filenames: List[Union[str, Path]],
+    out_dir: Optional[Union[str, Path]] = None,
+    workers: Optional[int] = None
+) -> Dict[Path, List[CarvedFile]]:
+    """Carve many files in a process pool. Directories are searched recursively.
+
+    :param filenames: Paths to files or directories to carve.
+    :param out_dir: Directory to write carved files to.
+    :param workers: Number of worker processes. Defaults to the number of CPUs.
+    :returns: Dict mapping each input file to its carved files.
+    """
+    files = []
+    for filename in map(Path, filenames):
+        files.extend(sorted(p for p in filename.rglob("*") if p.is_file()) if filename.is_dir() else [filename])
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return dict(zip(files, executor.map(carve, files, [out_dir] * len(files))))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = ArgumentParser(description="Carve embedded files out of files or directories.")
+    parser.add_argument("inputs", nargs="+", help="Files or directories to carve.")
+    parser.add_argument("--out", default="carved", help="Directory to write carved files to.")
+    parser.add_argument("--workers", type=int, help="Number of worker processes.")
+    args = parser.parse_args(argv)
+
+    for filename, carved in carve_all(args.inputs, out_dir=args.out, workers=args.workers).items():
+        for c in carved:
+            print(f"{filename}: {c.kind} at [{c.start}, {c.end}) -> {c.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Vectorized b64_xor engine. Produces the same output as `utils.utils.encrypt`, but maps whole
+texts through lookup tables in NumPy instead of calling `b64_xor` once per character.
+"""
+
+from itertools import islice
+from typing import Callable, Dict, Optional, Union
+
+import numpy as np
+
+from utils.keystream import lfsr_block, lfsr_kwargs_supported
+from utils.utils import ALPHABET, lfsr, ord_map, validate_keystream_args
+
+# Byte value used in `ORD_TABLE` for bytes that are not in `ALPHABET`
+INVALID = 255
+
+# Lookup tables mapping bytes to base64 character codes, and base64 character codes to bytes
+ORD_TABLE = np.full(256, INVALID, dtype=np.uint8)
+ORD_TABLE[np.frombuffer(ALPHABET.encode("ascii"), dtype=np.uint8)] = np.arange(len(ALPHABET), dtype=np.uint8)
+CHR_TABLE = np.frombuffer(ALPHABET.encode("ascii"), dtype=np.uint8).copy()
+
+Text = Union[str, bytes, bytearray, memoryview]
+
+
+def to_buffer(text: Text) -> np.ndarray:
+    """View input text as an array of bytes. Strings are encoded as UTF-8, where all multibyte
+    characters fall outside `ALPHABET` and are left untouched by the cipher.
+
+    :param text: String or bytes-like object.
+    :returns: Array of `uint8` values. Bytes-like input is not copied.
+    """
+    if isinstance(text, str):
+        text = text.encode("utf-8", "surrogatepass")
+
+    return np.frombuffer(text, dtype=np.uint8)
+
+
+def from_buffer(buffer: np.ndarray, as_str: bool) -> Union[str, bytes]:
+    """Inverse of `to_buffer`.
+
+    :param buffer: Array of `uint8` values.
+    :param as_str: Whether to decode the buffer to a string.
+    :returns: String if `as_str` is True, otherwise bytes.
+    """
+    data = buffer.tobytes()
+    return data.decode("utf-8", "surrogatepass") if as_str else data
+
+
+def key_codes(key: str) -> np.ndarray:
+    """Map a key string to an array of base64 character codes.
+
+    :param key: Key string.
+    :raises ValueError: If the key contains characters outside `ALPHABET`.
+    :returns: Array of base64 character codes.
+    """
+    codes = ORD_TABLE[to_buffer(key)]
+    if np.any(codes == INVALID):
+        invalid = next(c for c in key if c not in ord_map)
+        raise ValueError(f"Got invalid key character '{invalid}'. Valid characters are: '{ALPHABET}'.")
+
+    return codes
+
+
+class Keystream:
+    """Stateful source of base64 key codes, equivalent to the keystream consumed by `encrypt`.
+    Each call to `take` continues where the previous call stopped.
+
+    The rotating key keystream and `lfsr` keystreams can start at any `position` in constant
+    and logarithmic time respectively. Other generators are advanced one value at a time.
+
+    :param key: Key to use for the rotating key keystream.
+    :param keystream: Generator to use for generating the keystream bits.
+    :param keystream_kwargs: Keyword arguments to the keystream generator.
+    :param position: Index of the first key code to take, i.e. the number of `ALPHABET`
+        characters preceding the text to encrypt.
+    """
+
+    def __init__(
+        self,
+        key: Optional[str] = None,
+        keystream: Callable = None,
+        keystream_kwargs: Optional[Dict] = None,
+        position: int = 0
+    ):
+        validate_keystream_args(key=key, keystream=keystream, keystream_kwargs=keystream_kwargs)
+        self.position = position
+        self._key_codes = None
+        self._lfsr_kwargs = None
+        self._generator = None
+        if keystream is None:
+            self._key_codes = key_codes(key)
+        elif keystream is lfsr and lfsr_kwargs_supported(keystream_kwargs):
+            self._lfsr_kwargs = keystream_kwargs
+        else:
+            self._generator = keystream(**keystream_kwargs)
+            next(islice(self._generator, position, position), None)
+
+    def take(self, n: int) -> np.ndarray:
+        """Get the next `n` key codes.
+
+        :param n: Number of key codes to get.
+        :raises ValueError: If the keystream generator yields an invalid value, or fewer than
+            `n` values.
+        :returns: Array of `n` base64 character codes.
+        """
+        if self._key_codes is not None:
+            codes = self._rotating_key(n)
+        elif self._lfsr_kwargs is not None:
+            codes = self._lfsr(n)
+        else:
+            codes = self._from_generator(n)
+
+        self.position += n
+        return codes
+
+    def _rotating_key(self, n: int) -> np.ndarray:
+        if not n:
+            return np.empty(0, dtype=np.uint8)
+        elif not len(self._key_codes):
+            raise ValueError("`key` must contain at least one character")
+
+        return self._key_codes.take(np.arange(self.position, self.position + n) % len(self._key_codes))
+
+    def _lfsr(self, n: int) -> np.ndarray:
+        block = lfsr_block(count=n, offset=self.position, **self._lfsr_kwargs)
+        return (block % np.uint64(len(ALPHABET))).astype(np.uint8)
+
+    def _from_generator(self, n: int) -> np.ndarray:
+        codes = np.empty(n, dtype=np.uint8)
+        filled = 0
+        for k in islice(self._generator, n):
+            if isinstance(k, int):
+                codes[filled] = k % len(ALPHABET)
+            elif k in ord_map:
+                codes[filled] = ord_map[k]
+            else:
+                raise ValueError(f"Got invalid keystream value {k!r}. Valid characters are: '{ALPHABET}'.")
+            filled += 1
+
+        if filled < n:
+            raise ValueError(f"The keystream ran out after {self.position + filled} values, needed {self.position + n}")
+
+        return codes
+
+
+def count_alphabet(text: Text) -> int:
+    """Count the `ALPHABET` characters in the input text, i.e. the number of key codes
+    `encrypt` consumes when encrypting it.
+
+    :param text: String or bytes-like object.
+    :returns: Number of `ALPHABET` characters.
+    """
+    return int(np.count_nonzero(ORD_TABLE[to_buffer(text)] != INVALID))
+
+
+def xor_buffer(buffer: np.ndarray, keystream: Keystream) -> np.ndarray:
+    """b64_xor all `ALPHABET` bytes in `buffer` with the next key codes from `keystream`.
+    All other bytes are copied unchanged.
+
+    :param buffer: Array of `uint8` values.
+    :param keystream: Keystream to draw key codes from.
+    :returns: New array with the encrypted bytes.
+    """
+    codes = ORD_TABLE[buffer]
+    in_alphabet = codes != INVALID
+    output = buffer.copy()
+    output[in_alphabet] = CHR_TABLE[codes[in_alphabet] ^ keystream.take(int(np.count_nonzero(in_alphabet)))]
+    return output
+
+
+def encrypt_bulk(
+    text: Text,
+    key: Optional[str] = None,
+    keystream: Callable = None,
+    keystream_kwargs: Optional[Dict] = None,
+    offset: int = 0
+) -> Union[str, bytes]:
+    """Encrypt input text with the given key using b64_xor encryption. Gives the same output
+    as `utils.utils.encrypt`, but processes the whole text in one pass.
+
+    With `offset`, a slice of a longer text can be encrypted or decrypted on its own, ex:
+    `encrypt_bulk(text[i:], key, offset=n)` equals `encrypt_bulk(text, key)[i:]` when `n` is
+    the number of `ALPHABET` characters in `text[:i]`.
+
+    :param text: The text to encrypt. Either a string or a bytes-like object.
+    :param key: Key to use for encrypting the text.
+        Only used with the default keystream generator.
+    :param keystream: Generator to use for generating the keystream bits.
+        Defaults to a rotating key keystream.
+    :param keystream_kwargs: Keyword arguments to the keystream generator.
+        Only necessary if `keystream` is provided.
+    :param offset: Keystream position of the first `ALPHABET` character in `text`.
+    :raises ValueError: On invalid combinations of `key`, `keystream` and `keystream_kwargs`,
+        or if the keystream produces characters outside `ALPHABET` or runs out.
+    :returns: Encrypted string if `text` is a string, otherwise encrypted bytes.
+    """
+    _keystream = Keystream(key=key, keystream=keystream, keystream_kwargs=keystream_kwargs, position=offset)
+    output = xor_buffer(to_buffer(text), _keystream)
+    return from_buffer(output, as_str=isinstance(text, str))
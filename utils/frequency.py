@@ -0,0 +1,253 @@
+"""
+Streaming letter frequency analysis. Unigrams, bigrams and trigrams of the letters a-z are
+counted with `numpy.bincount` over byte buffers, in one pass over the input. Letters are
+counted regardless of case, and n-grams only count letters that are next to each other in the
+input, so "the eel" has the doubled letter "ee" once.
+
+Counts from different parts of the input can be added together, so large files and corpora
+are counted in shards in a process pool. Run as a script to print a report for files, ex:
+
+    python -m utils.frequency ciphertext.txt
+"""
+
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from string import ascii_lowercase
+from typing import BinaryIO, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+# Default number of bytes to read per chunk
+CHUNK_SIZE = 1 << 22
+
+# Default number of bytes per shard when counting files in parallel
+SHARD_SIZE = 64 << 20
+
+# Code of all bytes that are not letters
+_OTHER = 26
+
+# Lookup table mapping bytes to letter codes 0-25, or `_OTHER`
+CODE_TABLE = np.full(256, _OTHER, dtype=np.uint8)
+CODE_TABLE[np.frombuffer(ascii_lowercase.encode("ascii"), dtype=np.uint8)] = np.arange(26)
+CODE_TABLE[np.frombuffer(ascii_lowercase.upper().encode("ascii"), dtype=np.uint8)] = np.arange(26)
+
+
+class NgramCounts:
+    """Counts of the unigrams, bigrams and trigrams of the letters a-z.
+
+    :param unigrams: Array of shape (26,) of letter counts.
+    :param bigrams: Array of shape (26, 26) of bigram counts.
+    :param trigrams: Array of shape (26, 26, 26) of trigram counts.
+    """
+
+    def __init__(
+        self,
+        unigrams: Optional[np.ndarray] = None,
+        bigrams: Optional[np.ndarray] = None,
+        trigrams: Optional[np.ndarray] = None
+    ):
+        self.unigrams = np.zeros(26, dtype=np.int64) if unigrams is None else unigrams
+        self.bigrams = np.zeros((26, 26), dtype=np.int64) if bigrams is None else bigrams
+        self.trigrams = np.zeros((26, 26, 26), dtype=np.int64) if trigrams is None else trigrams
+
+    def __add__(self, other: "NgramCounts") -> "NgramCounts":
+        return NgramCounts(
+            self.unigrams + other.unigrams,
+            self.bigrams + other.bigrams,
+            self.trigrams + other.trigrams
+        )
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, NgramCounts) and all(
+            np.array_equal(a, b) for a, b in zip(self._arrays(), other._arrays())
+        )
+
+    def _arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return self.unigrams, self.bigrams, self.trigrams
+
+    @property
+    def total(self) -> int:
+        """Number of letters counted."""
+        return int(self.unigrams.sum())
+
+    @property
+    def doubled(self) -> np.ndarray:
+        """Array of shape (26,) of the counts of each letter doubled, ex. "ee"."""
+        return np.diagonal(self.bigrams).copy()
+
+    def index_of_coincidence(self) -> float:
+        """Get the probability that two letters drawn at random from the input are the same.
+        English text is around 0.066, and uniformly random letters 1/26, around 0.038.
+
+        :returns: The index of coincidence, or 0 if fewer than two letters were counted.
+        """
+        total = self.total
+        if total < 2:
+            return 0.0
+
+        return float((self.unigrams * (self.unigrams - 1)).sum() / (total * (total - 1)))
+
+    def most_common(self, n: int = 1, top: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Get the most common n-grams, like `collections.Counter.most_common`.
+
+        :param n: Length of the n-grams, 1, 2 or 3.
+        :param top: Number of n-grams to get. Gets all n-grams that occur by default.
+        :returns: List of (n-gram, count), sorted by descending count, then alphabetically.
+        """
+        counts = self._arrays()[n - 1].ravel()
+        order = np.argsort(-counts, kind="stable")[:np.count_nonzero(counts)][:top]
+        return [(_ngram(int(i), n), int(counts[i])) for i in order]
+
+    def unigram_dict(self) -> Dict[str, int]:
+        """Get the counts of the letters that occur, as a dict from letter to count."""
+        return {ascii_lowercase[i]: int(c) for i, c in enumerate(self.unigrams) if c}
+
+
+def _ngram(index: int, n: int) -> str:
+    letters = []
+    for _ in range(n):
+        index, letter = divmod(index, 26)
+        letters.append(ascii_lowercase[letter])
+
+    return "".join(reversed(letters))
+
+
+def _count_codes(codes: np.ndarray, n_starts: Optional[int] = None) -> NgramCounts:
+    """Count the n-grams of letter codes starting at the first `n_starts` indices. Codes after
+    those are only used to complete the n-grams."""
+    n_starts = len(codes) if n_starts is None else n_starts
+    if len(codes) < n_starts + 2:
+        codes = np.concatenate((codes, np.full(n_starts + 2 - len(codes), _OTHER, dtype=np.uint8)))
+
+    # Count the trigram starting at every position in base 27 with a single `bincount`. Summing
+    # out the last letters gives the bigrams and unigrams, and slicing drops the n-grams
+    # containing `_OTHER`.
+    index = codes[:n_starts].astype(np.uint16)
+    index *= 27
+    index += codes[1:n_starts + 1]
+    index *= 27
+    index += codes[2:n_starts + 2]
+    binned = np.bincount(index, minlength=27 ** 3).reshape(27, 27, 27)
+    return NgramCounts(
+        binned.sum(axis=(1, 2))[:26],
+        binned.sum(axis=2)[:26, :26],
+        binned[:26, :26, :26].copy()
+    )
+
+
+def count_bytes(data: Union[bytes, bytearray, memoryview, np.ndarray]) -> NgramCounts:
+    """Count the letter n-grams in a buffer of ASCII compatible text, ex. UTF-8.
+
+    :param data: Bytes-like object.
+    :returns: The counts.
+    """
+    return _count_codes(CODE_TABLE[np.frombuffer(data, dtype=np.uint8)])
+
+
+def count_text(text: str) -> NgramCounts:
+    """Count the letter n-grams in a string. Only the ASCII letters a-z are counted.
+
+    :param text: Input string.
+    :returns: The counts.
+    """
+    return count_bytes(text.encode("utf-8", "surrogatepass"))
+
+
+def count_stream(source: BinaryIO, chunk_size: int = CHUNK_SIZE, limit: Optional[int] = None) -> NgramCounts:
+    """Count the letter n-grams in everything read from `source`, one chunk at a time. The last
+    two bytes of each chunk are carried over, so n-grams across chunk boundaries are counted.
+
+    :param source: Binary file object to read from.
+    :param chunk_size: Number of bytes to read per chunk.
+    :param limit: Only count n-grams starting in the next `limit` bytes. Up to two more bytes
+        are read to complete the last n-grams, so that counts of consecutive ranges add up to
+        the counts of the whole input.
+    :returns: The counts.
+    """
+    counts = NgramCounts()
+    carry = np.empty(0, dtype=np.uint8)
+    remaining = limit
+    while remaining is None or remaining > 0:
+        chunk = source.read(chunk_size if remaining is None else min(chunk_size, remaining))
+        if not chunk:
+            break
+        elif remaining is not None:
+            remaining -= len(chunk)
+
+        codes = np.concatenate((carry, CODE_TABLE[np.frombuffer(chunk, dtype=np.uint8)]))
+        n_starts = max(len(codes) - 2, 0)
+        counts += _count_codes(codes, n_starts)
+        carry = codes[n_starts:]
+
+    lookahead = CODE_TABLE[np.frombuffer(source.read(2), dtype=np.uint8)] if limit is not None else carry[:0]
+    return counts + _count_codes(np.concatenate((carry, lookahead)), len(carry))
+
+
+def count_file(filename: Union[str, Path], start: int = 0, stop: Optional[int] = None, chunk_size: int = CHUNK_SIZE) -> NgramCounts:
+    """Count the letter n-grams starting in the byte range [start, stop) of a file.
+
+    :param filename: Path to the file.
+    :param start: Offset of the first byte.
+    :param stop: Offset to stop at. Counts to the end of the file by default.
+    :param chunk_size: Number of bytes to read per chunk.
+    :returns: The counts.
+    """
+    with open(filename, "rb") as f:
+        f.seek(start)
+        return count_stream(f, chunk_size=chunk_size, limit=None if stop is None else stop - start)
+
+
+def count_files(
+    filenames: Sequence[Union[str, Path]],
+    workers: Optional[int] = None,
+    shard_size: int = SHARD_SIZE
+) -> NgramCounts:
+    """Count the letter n-grams in many files in a process pool. Files are split into shards
+    of `shard_size` bytes, and the counts of all shards are added together.
+
+    :param filenames: Paths to the files.
+    :param workers: Number of worker processes. Defaults to the number of CPUs.
+    :param shard_size: Number of bytes per shard.
+    :returns: The counts of all files together. N-grams do not span files.
+    """
+    shards = [
+        (filename, start, start + shard_size)
+        for filename in filenames
+        for start in range(0, max(Path(filename).stat().st_size, 1), shard_size)
+    ]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return sum(executor.map(count_file, *zip(*shards)), NgramCounts()) if shards else NgramCounts()
+
+
+def print_report(counts: NgramCounts, top: int = 10) -> None:
+    """Print the most common n-grams and doubled letters, and the index of coincidence.
+
+    :param counts: The counts to report.
+    :param top: Number of entries to print per table.
+    """
+    print(f"Letters: {counts.total}")
+    print(f"Index of coincidence: {counts.index_of_coincidence():.4f}")
+    doubled = [(f"{ascii_lowercase[i] * 2}", int(counts.doubled[i])) for i in np.argsort(-counts.doubled, kind="stable")]
+    tables = {
+        "Unigrams": counts.most_common(1, top),
+        "Bigrams": counts.most_common(2, top),
+        "Trigrams": counts.most_common(3, top),
+        "Doubled letters": [(ngram, count) for ngram, count in doubled if count][:top],
+    }
+    for name, table in tables.items():
+        print(f"{name}: " + ", ".join(f"{ngram}={count}" for ngram, count in table))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = ArgumentParser(description="Count letter n-grams in files.")
+    parser.add_argument("inputs", nargs="+", help="Files to count.")
+    parser.add_argument("--top", type=int, default=10, help="Number of entries to print per table.")
+    parser.add_argument("--workers", type=int, help="Number of worker processes.")
+    args = parser.parse_args(argv)
+
+    print_report(count_files(args.inputs, workers=args.workers), top=args.top)
+
+
+if __name__ == "__main__":
+    main()
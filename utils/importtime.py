@@ -0,0 +1,68 @@
+"""
+Check that the modules used by short command line invocations import within a fixed time
+budget, using `python -X importtime`. Exits with status 1 if any module is over budget, ex:
+
+    python -m utils.importtime
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, Optional
+
+# Maximum cumulative import time in milliseconds for each module
+IMPORT_BUDGETS_MS = {
+    "utils.utils": 30,
+    "answers": 30,
+    "hints": 30,
+}
+
+# Number of runs per module. The fastest run is used, to reduce noise from the system.
+RUNS = 5
+
+
+def import_time_ms(module: str, runs: int = RUNS) -> float:
+    """Measure the cumulative import time of `module` in a fresh interpreter.
+
+    :param module: Name of the module to import.
+    :param runs: Number of runs. The fastest run is returned.
+    :returns: Import time in milliseconds.
+    """
+    repo_root = Path(__file__).resolve().parent.parent
+    times = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=repo_root,
+            capture_output=True,
+            text=True,
+            check=True
+        )
+        # Lines have the format "import time: <self us> | <cumulative us> | <indented module name>"
+        for line in result.stderr.splitlines():
+            fields = line.split("|")
+            if len(fields) == 3 and fields[2].strip() == module:
+                times.append(int(fields[1]) / 1000)
+
+    return min(times)
+
+
+def check_import_times(budgets: Optional[Dict[str, float]] = None) -> bool:
+    """Print the import time of each module and whether it is within its budget.
+
+    :param budgets: Dict mapping module names to budgets in milliseconds.
+        Defaults to `IMPORT_BUDGETS_MS`.
+    :returns: Whether all modules are within their budgets.
+    """
+    ok = True
+    for module, budget in (budgets or IMPORT_BUDGETS_MS).items():
+        elapsed = import_time_ms(module)
+        within_budget = elapsed <= budget
+        ok &= within_budget
+        print(f"{module}: {elapsed:.1f} ms (budget {budget} ms) {'OK' if within_budget else 'OVER BUDGET'}")
+
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if check_import_times() else 1)
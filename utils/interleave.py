@@ -0,0 +1,273 @@
+"""
+Streaming N-way interleaving and deinterleaving of files. Interleaving takes one record of
+`stride` bytes or characters from each input in turn, like `zip_longest` with an empty fill
+value, and deinterleaving deals the records of one input out to N outputs in turn.
+
+Inputs are read in chunks and records are moved with strided slice assignment, so memory use
+is bounded by the chunk size. Text is interleaved as UTF-32, where every character is four
+bytes. Run as a script to interleave or deinterleave files, ex:
+
+    python -m utils.interleave file1 file2 file3 file4 --out joined
+    python -m utils.interleave joined --split file1 file2 file3 file4
+"""
+
+import io
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import IO, List, Optional, Sequence, Union
+
+# Default number of records to read from each input per chunk
+CHUNK_RECORDS = 1 << 18
+
+# Encoding used to give every character a fixed width when interleaving text
+_FIXED_WIDTH_ENCODING = "utf-32-le"
+_CHAR_WIDTH = 4
+
+
+def _interleave_segment(parts: List[bytes], stride: int) -> bytearray:
+    """Interleave parts with the same number of full records."""
+    n = len(parts)
+    output = bytearray(n * len(parts[0]))
+    for i, part in enumerate(parts):
+        for j in range(stride):
+            output[i * stride + j::n * stride] = part[j::stride]
+
+    return output
+
+
+def interleave_bytes(chunks: Sequence[bytes], stride: int = 1) -> bytes:
+    """Interleave records of `stride` bytes from each chunk in turn. When a chunk runs out of
+    records it is skipped, and a last record shorter than `stride` is kept as is.
+
+    :param chunks: Bytes to interleave.
+    :param stride: Number of bytes per record.
+    :raises ValueError: If `stride` is less than 1.
+    :returns: The interleaved bytes.
+    """
+    if stride < 1:
+        raise ValueError(f"`stride` must be at least 1. Got {stride = }")
+
+    full_records = [len(c) // stride for c in chunks]
+    output = []
+    record = 0
+    active = list(range(len(chunks)))
+    while active:
+        # Interleave the records all active chunks have in full as one block
+        end = min(full_records[i] for i in active)
+        if end > record:
+            parts = [chunks[i][record * stride:end * stride] for i in active]
+            output.append(_interleave_segment(parts, stride) if len(parts) > 1 else parts[0])
+
+        # The record at `end` is partial or missing in at least one chunk
+        output.extend(chunks[i][end * stride:(end + 1) * stride] for i in active)
+        record = end + 1
+        active = [i for i in active if full_records[i] > end]
+
+    return b"".join(output)
+
+
+def deinterleave_bytes(data: bytes, n: int, stride: int = 1) -> List[bytes]:
+    """Deal records of `stride` bytes out to `n` outputs in turn. The inverse of
+    `interleave_bytes` when all interleaved inputs had the same length.
+
+    :param data: Bytes to deinterleave.
+    :param n: Number of outputs.
+    :param stride: Number of bytes per record.
+    :raises ValueError: If `n` or `stride` is less than 1.
+    :returns: List of `n` outputs.
+    """
+    if n < 1 or stride < 1:
+        raise ValueError(f"`n` and `stride` must be at least 1. Got {n = }, {stride = }")
+
+    round_size = n * stride
+    aligned = len(data) // round_size * round_size
+    outputs = []
+    for i in range(n):
+        output = bytearray(aligned // n)
+        for j in range(stride):
+            output[j::stride] = data[i * stride + j:aligned:round_size]
+
+        # Records after the last full round go to the first outputs
+        output += data[aligned + i * stride:aligned + (i + 1) * stride]
+        outputs.append(bytes(output))
+
+    return outputs
+
+
+def interleave_text(texts: Sequence[str], stride: int = 1) -> str:
+    """Interleave records of `stride` characters from each text in turn, see `interleave_bytes`.
+
+    :param texts: Strings to interleave.
+    :param stride: Number of characters per record.
+    :returns: The interleaved string.
+    """
+    chunks = [t.encode(_FIXED_WIDTH_ENCODING, "surrogatepass") for t in texts]
+    return interleave_bytes(chunks, stride * _CHAR_WIDTH).decode(_FIXED_WIDTH_ENCODING, "surrogatepass")
+
+
+def deinterleave_text(text: str, n: int, stride: int = 1) -> List[str]:
+    """Deal records of `stride` characters out to `n` outputs in turn, see `deinterleave_bytes`.
+
+    :param text: String to deinterleave.
+    :param n: Number of outputs.
+    :param stride: Number of characters per record.
+    :returns: List of `n` strings.
+    """
+    data = text.encode(_FIXED_WIDTH_ENCODING, "surrogatepass")
+    return [
+        part.decode(_FIXED_WIDTH_ENCODING, "surrogatepass")
+        for part in deinterleave_bytes(data, n, stride * _CHAR_WIDTH)
+    ]
+
+
+def _read(source: IO, size: int) -> Union[str, bytes]:
+    """Read `size` bytes or characters, or fewer only at the end of the input."""
+    data = source.read(size)
+    while data and len(data) < size:
+        more = source.read(size - len(data))
+        if not more:
+            break
+        data += more
+
+    return data
+
+
+def interleave_streams(
+    sources: Sequence[IO],
+    destination: IO,
+    stride: int = 1,
+    chunk_records: int = CHUNK_RECORDS
+) -> int:
+    """Interleave everything read from `sources` and write the result to `destination`, one
+    chunk at a time. Text file objects are interleaved by characters, binary ones by bytes.
+
+    :param sources: File objects to read from, all in text mode or all in binary mode.
+    :param destination: File object to write to, in the same mode as `sources`.
+    :param stride: Number of bytes or characters per record.
+    :param chunk_records: Number of records to read from each source per chunk.
+    :returns: Number of bytes or characters written.
+    """
+    text = bool(sources) and isinstance(sources[0], io.TextIOBase)
+    active = list(sources)
+    written = 0
+    while active:
+        chunks = [_read(source, chunk_records * stride) for source in active]
+        if text:
+            output = interleave_text(chunks, stride=stride)
+        else:
+            output = interleave_bytes(chunks, stride=stride)
+
+        written += destination.write(output)
+        # Only sources that filled their chunk can have more data
+        active = [source for source, chunk in zip(active, chunks) if len(chunk) == chunk_records * stride]
+
+    return written
+
+
+def deinterleave_stream(
+    source: IO,
+    destinations: Sequence[IO],
+    stride: int = 1,
+    chunk_records: int = CHUNK_RECORDS
+) -> int:
+    """Deal the records read from `source` out to `destinations` in turn, one chunk at a time.
+
+    :param source: File object to read from, in text or binary mode.
+    :param destinations: File objects to write to, in the same mode as `source`.
+    :param stride: Number of bytes or characters per record.
+    :param chunk_records: Number of records to write to each destination per chunk.
+    :returns: Number of bytes or characters read.
+    """
+    text = isinstance(source, io.TextIOBase)
+    read = 0
+    # Chunks hold whole rounds of records, so each chunk starts at the first destination
+    while chunk := _read(source, chunk_records * stride * len(destinations)):
+        read += len(chunk)
+        if text:
+            parts = deinterleave_text(chunk, len(destinations), stride=stride)
+        else:
+            parts = deinterleave_bytes(chunk, len(destinations), stride=stride)
+
+        for destination, part in zip(destinations, parts):
+            destination.write(part)
+
+    return read
+
+
+def interleave_files(
+    in_files: Sequence[Union[str, Path]],
+    out_file: Union[str, Path],
+    stride: int = 1,
+    text: bool = False,
+    encoding: str = "utf-8",
+    chunk_records: int = CHUNK_RECORDS
+) -> int:
+    """Interleave files, see `interleave_streams`.
+
+    :param in_files: Paths to the files to interleave.
+    :param out_file: Path to write the interleaved file to.
+    :param stride: Number of bytes, or characters if `text`, per record.
+    :param text: Whether to interleave characters instead of bytes.
+    :param encoding: Encoding of the files in text mode.
+    :param chunk_records: Number of records to read from each file per chunk.
+    :returns: Number of bytes or characters written.
+    """
+    mode = {"encoding": encoding} if text else {}
+    sources = [open(filename, "r" if text else "rb", **mode) for filename in in_files]
+    try:
+        with open(out_file, "w" if text else "wb", **mode) as destination:
+            return interleave_streams(sources, destination, stride=stride, chunk_records=chunk_records)
+    finally:
+        for source in sources:
+            source.close()
+
+
+def deinterleave_file(
+    in_file: Union[str, Path],
+    out_files: Sequence[Union[str, Path]],
+    stride: int = 1,
+    text: bool = False,
+    encoding: str = "utf-8",
+    chunk_records: int = CHUNK_RECORDS
+) -> int:
+    """Deinterleave a file into one file per output, see `deinterleave_stream`.
+
+    :param in_file: Path to the file to deinterleave.
+    :param out_files: Paths to write the deinterleaved files to.
+    :param stride: Number of bytes, or characters if `text`, per record.
+    :param text: Whether to deinterleave characters instead of bytes.
+    :param encoding: Encoding of the files in text mode.
+    :param chunk_records: Number of records to write to each file per chunk.
+    :returns: Number of bytes or characters read.
+    """
+    mode = {"encoding": encoding} if text else {}
+    destinations = [open(filename, "w" if text else "wb", **mode) for filename in out_files]
+    try:
+        with open(in_file, "r" if text else "rb", **mode) as source:
+            return deinterleave_stream(source, destinations, stride=stride, chunk_records=chunk_records)
+    finally:
+        for destination in destinations:
+            destination.close()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = ArgumentParser(description="Interleave files record by record, or deinterleave a file.")
+    parser.add_argument("inputs", nargs="+", help="Files to interleave, or one file to deinterleave with --split.")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--out", help="File to write the interleaved inputs to.")
+    group.add_argument("--split", nargs="+", help="Files to deinterleave the input into.")
+    parser.add_argument("--stride", type=int, default=1, help="Number of bytes or characters per record.")
+    parser.add_argument("--text", action="store_true", help="Interleave characters instead of bytes.")
+    parser.add_argument("--encoding", default="utf-8", help="Encoding of the files in text mode.")
+    args = parser.parse_args(argv)
+
+    if args.split:
+        if len(args.inputs) != 1:
+            parser.error("--split takes exactly one input file")
+        deinterleave_file(args.inputs[0], args.split, stride=args.stride, text=args.text, encoding=args.encoding)
+    else:
+        interleave_files(args.inputs, args.out, stride=args.stride, text=args.text, encoding=args.encoding)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Jump-ahead and block generation for the `utils.utils.lfsr` keystream.
+
+The register in `lfsr` is a Galois LFSR: each step computes `x * state mod P(x)` over GF(2),
+where `P(x)` is the polynomial with the bits of `mask` as coefficients. The state after `k`
+steps is therefore `x^k * seed mod P(x)`, which can be computed in O(log k) multiplications.
+"""
+
+from typing import Dict, Iterator
+
+import numpy as np
+
+# Number of register values generated step by step before switching to table-driven doubling
+BASE_BLOCK_SIZE = 64
+
+
+def register_size(seed: int, mask: int) -> int:
+    """Get the number of state bits of the register `lfsr(seed, mask)`, and check that the
+    register can be modelled as a Galois LFSR with states that fit in a `uint64`.
+
+    :param seed: Initial integer of the register.
+    :param mask: Mask of the register.
+    :raises ValueError: If `mask` does not have between 2 and 65 bits, or if `seed` is
+        negative or does not fit in the register.
+    :returns: Number of state bits.
+    """
+    nbits = mask.bit_length() - 1
+    if not 1 <= nbits <= 64:
+        raise ValueError(f"`mask` must have between 2 and 65 bits. Got {mask = }")
+    elif not 0 <= seed < 1 << nbits:
+        raise ValueError(f"`seed` must be in the range [0, {1 << nbits}) for {mask = }. Got {seed = }")
+
+    return nbits
+
+
+def is_supported(seed: int, mask: int) -> bool:
+    """Check whether `register_size` accepts the register parameters.
+
+    :param seed: Initial integer of the register.
+    :param mask: Mask of the register.
+    :returns: Whether jump-ahead and block generation support the register.
+    """
+    if not isinstance(seed, int) or not isinstance(mask, int):
+        return False
+
+    try:
+        register_size(seed=seed, mask=mask)
+    except ValueError:
+        return False
+
+    return True
+
+
+def gf2_mulmod(a: int, b: int, poly: int) -> int:
+    """Multiply two polynomials over GF(2) modulo `poly`.
+
+    :param a: First polynomial, must already be reduced modulo `poly`.
+    :param b: Second polynomial.
+    :param poly: Modulus polynomial.
+    :returns: `a * b mod poly`.
+    """
+    degree = poly.bit_length() - 1
+    result = 0
+    while b:
+        if b & 1:
+            result ^= a
+        b >>= 1
+        a <<= 1
+        if a >> degree:
+            a ^= poly
+
+    return result
+
+
+def gf2_powmod_x(exponent: int, poly: int) -> int:
+    """Compute `x^exponent mod poly` over GF(2) by square-and-multiply.
+
+    :param exponent: Non-negative exponent.
+    :param poly: Modulus polynomial.
+    :returns: `x^exponent mod poly`.
+    """
+    result = 1
+    base = gf2_mulmod(1, 2, poly)
+    while exponent:
+        if exponent & 1:
+            result = gf2_mulmod(result, base, poly)
+        base = gf2_mulmod(base, base, poly)
+        exponent >>= 1
+
+    return result
+
+
+def lfsr_state(seed: int, mask: int, steps: int) -> int:
+    """Get the register value of `lfsr(seed, mask)` after `steps` steps, in O(log steps).
+
+    :param seed: Initial integer of the register.
+    :param mask: Mask of the register.
+    :param steps: Number of steps to jump ahead.
+    :returns: Register value after `steps` steps.
+    """
+    register_size(seed=seed, mask=mask)
+    return gf2_mulmod(seed, gf2_powmod_x(steps, mask), mask)
+
+
+def _multiplier_tables(multiplier: int, mask: int, nbits: int) -> np.ndarray:
+    """Build byte lookup tables for multiplying register states by `multiplier` modulo `mask`.
+
+    :returns: Array of shape (number of state bytes, 256), where entry `[b, v]` holds
+        `(v << 8 * b) * multiplier mod mask`.
+    """
+    nbytes = (nbits + 7) // 8
+    basis = np.array(
+        [gf2_mulmod(multiplier, 1 << i, mask) for i in range(nbytes * 8)],
+        dtype=np.uint64
+    ).reshape(nbytes, 8)
+    values = np.arange(256)
+    tables = np.zeros((nbytes, 256), dtype=np.uint64)
+    for bit in range(8):
+        tables[:, (values >> bit) & 1 == 1] ^= basis[:, bit, None]
+
+    return tables
+
+
+def _multiply_states(states: np.ndarray, tables: np.ndarray) -> np.ndarray:
+    output = np.zeros_like(states)
+    for b, table in enumerate(tables):
+        output ^= table[(states >> np.uint64(8 * b)) & np.uint64(0xFF)]
+
+    return output
+
+
+def lfsr_block(seed: int, mask: int, count: int, offset: int = 0, skip: int = 10) -> np.ndarray:
+    """Get a block of the values yielded by `lfsr(seed, mask, skip)`, starting at the
+    `offset`-th yielded value. Jumps to `offset` in O(log offset), and builds the block by
+    repeatedly doubling the generated prefix with table lookups.
+
+    :param seed: Initial integer of the register.
+    :param mask: Mask of the register.
+    :param count: Number of values to generate.
+    :param offset: Index of the first value to generate.
+    :param skip: Same as the `skip` argument of `lfsr`.
+    :returns: Array of `count` register values as `uint64`.
+    """
+    nbits = register_size(seed=seed, mask=mask)
+    top_bit = 1 << (nbits - 1)
+    low_mask = (1 << nbits) - 1
+    output = np.empty(count, dtype=np.uint64)
+
+    state = lfsr_state(seed=seed, mask=mask, steps=max(skip, 0) + offset + 1)
+    filled = min(count, BASE_BLOCK_SIZE)
+    for i in range(filled):
+        output[i] = state
+        state = ((state << 1) & low_mask) ^ (mask & low_mask if state & top_bit else 0)
+
+    while filled < count:
+        n = min(filled, count - filled)
+        tables = _multiplier_tables(gf2_powmod_x(filled, mask), mask, nbits)
+        output[filled:filled + n] = _multiply_states(output[:n], tables)
+        filled += n
+
+    return output
+
+
+def lfsr_blocks(seed: int, mask: int, block_size: int, offset: int = 0, skip: int = 10) -> Iterator[np.ndarray]:
+    """Iterate over consecutive keystream blocks of `lfsr(seed, mask, skip)`.
+
+    :param seed: Initial integer of the register.
+    :param mask: Mask of the register.
+    :param block_size: Number of values per block.
+    :param offset: Index of the first value to generate.
+    :param skip: Same as the `skip` argument of `lfsr`.
+    :yields: Arrays of `block_size` register values as `uint64`.
+    """
+    while True:
+        yield lfsr_block(seed=seed, mask=mask, count=block_size, offset=offset, skip=skip)
+        offset += block_size
+
+
+def lfsr_kwargs_supported(keystream_kwargs: Dict) -> bool:
+    """Check whether keyword arguments to `lfsr` can be handled by `lfsr_block`.
+
+    :param keystream_kwargs: Keyword arguments to `lfsr`.
+    :returns: Whether `lfsr_block` supports the arguments.
+    """
+    if set(keystream_kwargs) - {"seed", "mask", "skip"}:
+        return False
+
+    return is_supported(seed=keystream_kwargs.get("seed"), mask=keystream_kwargs.get("mask"))
@@ -0,0 +1,275 @@
+"""
+Recovery of the parameters of `utils.utils.lfsr` from a known-plaintext keystream segment.
+
+`encrypt` uses the register values modulo 64 as key codes, i.e. the lowest 6 bits of each
+register state. `lfsr` is a Galois LFSR, where each step multiplies the state by x modulo
+the mask polynomial, so every bit of the state is a linear recurring sequence.
+Berlekamp-Massey finds the shortest recurrence of each of the 6 observed bit sequences, the
+mask is the least common multiple of their polynomials times a small cofactor, and the seed
+is found by solving a linear system over GF(2). The result is verified by regenerating the
+keystream with `lfsr`. Run as a script with a plain text and cipher text file, ex:
+
+    python -m utils.lfsr_recovery plain.txt encrypted.txt
+"""
+
+from argparse import ArgumentParser
+from itertools import islice
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from utils.cipher import INVALID, ORD_TABLE, Text, to_buffer
+from utils.keystream import gf2_powmod_x
+from utils.utils import ALPHABET, lfsr
+
+# Number of low state bits observed through the key codes, log2(len(ALPHABET))
+CODE_BITS = 6
+
+# Number of candidate cofactors of the mask, all polynomials of degree less than `CODE_BITS`
+COFACTORS = 1 << CODE_BITS
+
+# Fewest key codes `recover_lfsr` accepts, twice the smallest register that fills the code bits
+MIN_CODES = 2 * CODE_BITS
+
+
+class LfsrParameters(NamedTuple):
+    """Keyword arguments to `lfsr` that reproduce a keystream.
+
+    :param seed: Initial integer of the register.
+    :param mask: Mask of the register.
+    :param skip: Number of values skipped before the first yielded value.
+    """
+    seed: int
+    mask: int
+    skip: int
+
+
+def keystream_codes(plaintext: Text, ciphertext: Text) -> np.ndarray:
+    """Get the key codes used to encrypt `plaintext` into `ciphertext`.
+
+    :param plaintext: The known plain text.
+    :param ciphertext: The cipher text, same length as `plaintext`.
+    :raises ValueError: If the texts do not have `ALPHABET` characters at the same positions.
+    :returns: Array of `uint8` key codes, one per `ALPHABET` character.
+    """
+    plain, cipher = ORD_TABLE[to_buffer(plaintext)], ORD_TABLE[to_buffer(ciphertext)]
+    if len(plain) != len(cipher) or np.any((plain == INVALID) != (cipher == INVALID)):
+        raise ValueError("The plain text and cipher text must have `ALPHABET` characters at the same positions")
+
+    in_alphabet = plain != INVALID
+    return plain[in_alphabet] ^ cipher[in_alphabet]
+
+
+def berlekamp_massey(bits: np.ndarray) -> Tuple[int, int]:
+    """Find the shortest linear recurrence generating a bit sequence. The connection polynomial
+    and the reversed sequence window are bit-packed into integers, so each step is a few
+    word-wide operations, and the whole run is O(n^2) bit operations.
+
+    :param bits: Array of 0/1 values.
+    :returns: Tuple of (linear complexity L, connection polynomial C as an integer, where bit
+        `i` is the coefficient of x^i), such that `bits[n] = XOR(C_i * bits[n - i], i = 1..L)`.
+    """
+    connection, previous = 1, 1
+    length, shift = 0, 1
+    window = 0
+    for n, bit in enumerate(bits.tolist()):
+        # Bit i of `window` is bits[n - i]
+        window = (window << 1) | bit
+        if not (connection & window).bit_count() & 1:
+            shift += 1
+        elif 2 * length <= n:
+            connection, previous = connection ^ (previous << shift), connection
+            length, shift = n + 1 - length, 1
+        else:
+            connection ^= previous << shift
+            shift += 1
+
+    # Drop window bits beyond the recurrence, which are not part of the polynomial
+    return length, connection & ((1 << (length + 1)) - 1)
+
+
+def characteristic_polynomial(length: int, connection: int) -> int:
+    """Get the characteristic polynomial x^L * C(1/x) of a recurrence, i.e. the polynomial the
+    state of a Galois LFSR generating the sequence is reduced modulo.
+
+    :param length: Linear complexity L, see `berlekamp_massey`.
+    :param connection: Connection polynomial C, see `berlekamp_massey`.
+    :returns: Characteristic polynomial as an integer.
+    """
+    return int(f"{connection:0{length + 1}b}"[::-1], 2)
+
+
+def gf2_mul(a: int, b: int) -> int:
+    """Multiply two polynomials over GF(2)."""
+    result = 0
+    while b:
+        if b & 1:
+            result ^= a
+        a <<= 1
+        b >>= 1
+
+    return result
+
+
+def gf2_divmod(a: int, b: int) -> Tuple[int, int]:
+    """Divide two polynomials over GF(2)."""
+    quotient = 0
+    degree = b.bit_length()
+    while a.bit_length() >= degree:
+        shift = a.bit_length() - degree
+        quotient ^= 1 << shift
+        a ^= b << shift
+
+    return quotient, a
+
+
+def gf2_lcm(a: int, b: int) -> int:
+    """Get the least common multiple of two polynomials over GF(2)."""
+    x, y = a, b
+    while y:
+        x, y = y, gf2_divmod(x, y)[1]
+
+    return gf2_divmod(gf2_mul(a, b), x)[0]
+
+
+def _solve_gf2(rows: List[int], rhs: List[int]) -> Optional[int]:
+    """Solve a linear system over GF(2), with each row bit-packed into an integer. Free
+    variables are set to 0.
+
+    :returns: The solution bit-packed into an integer, or `None` if the system is inconsistent.
+    """
+    pivots = {}
+    for row, value in zip(rows, rhs):
+        for bit, (pivot_row, pivot_value) in pivots.items():
+            if row >> bit & 1:
+                row ^= pivot_row
+                value ^= pivot_value
+
+        if not row:
+            if value:
+                return None
+            continue
+
+        bit = row.bit_length() - 1
+        # Keep the pivot rows reduced, so each pivot bit only occurs in its own row
+        for other in pivots:
+            if pivots[other][0] >> bit & 1:
+                pivots[other] = (pivots[other][0] ^ row, pivots[other][1] ^ value)
+        pivots[bit] = (row, value)
+
+    return sum(1 << bit for bit, (_, value) in pivots.items() if value)
+
+
+def solve_seed(codes: np.ndarray, mask: int, skip: int = 10, offset: int = 0) -> Optional[int]:
+    """Find the seed of `lfsr(seed, mask, skip)` whose values modulo 64 match `codes`, starting
+    at the `offset`-th yielded value. The register state after k steps is x^k * seed modulo the
+    mask, so every observed bit is a linear function of the seed bits.
+
+    :param codes: Key codes, see `keystream_codes`.
+    :param mask: Mask of the register.
+    :param skip: Same as the `skip` argument of `lfsr`.
+    :param offset: Index of the first key code in the keystream.
+    :returns: The seed, or `None` if no seed matches.
+    """
+    nbits = mask.bit_length() - 1
+    first = skip + 1 + offset
+    # Use enough observations to determine the seed, the rest is checked by the verification
+    n_codes = min(len(codes), 4 * nbits + 16)
+
+    # The state reached from the seed bit x^0 after `first` steps
+    power = gf2_powmod_x(first, mask)
+
+    # Bit m of plane[j] is bit j of x^(first + m) mod mask
+    planes = [0] * CODE_BITS
+    for m in range(n_codes + nbits):
+        for j in range(min(CODE_BITS, nbits)):
+            planes[j] |= (power >> j & 1) << m
+        power = (power << 1) ^ (mask if power >> (nbits - 1) & 1 else 0)
+
+    # The observed bit j at index t is XOR(seed_i * bit j of x^(first + t + i)), i = 0..nbits-1
+    low_mask = (1 << nbits) - 1
+    rows, rhs = [], []
+    for t, code in enumerate(codes[:n_codes].tolist()):
+        for j in range(CODE_BITS):
+            row = planes[j] >> t & low_mask if j < nbits else 0
+            rows.append(row)
+            rhs.append(code >> j & 1)
+
+    return _solve_gf2(rows, rhs)
+
+
+def verify(codes: np.ndarray, parameters: LfsrParameters, offset: int = 0) -> bool:
+    """Check that `lfsr` with the given parameters regenerates the key codes.
+
+    :param codes: Key codes, see `keystream_codes`.
+    :param parameters: Parameters to check.
+    :param offset: Index of the first key code in the keystream.
+    :returns: Whether the regenerated key codes match.
+    """
+    values = islice(lfsr(**parameters._asdict()), offset, offset + len(codes))
+    return all(value % len(ALPHABET) == code for value, code in zip(values, codes.tolist()))
+
+
+def recover_lfsr(codes: np.ndarray, skip: int = 10, offset: int = 0) -> LfsrParameters:
+    """Recover `lfsr` parameters that reproduce a keystream.
+
+    The observed bits only determine the minimal polynomial M of the register states, which
+    divides the original mask P. The states are then (P / M) * v for states v of a register
+    with mask M, and only (P / M) modulo x^6 affects the low 6 bits, so a mask M * F with F of
+    degree less than 6 always reproduces the keystream. The smallest such mask is returned,
+    which is the original mask when the states are not confined to a smaller register.
+
+    Only the product of x^(skip + 1) and the seed determines the stream, so the seed is given
+    for the requested `skip`.
+
+    :param codes: Key codes, see `keystream_codes`. At least twice as many codes as the
+        register size are needed.
+    :param skip: `skip` to recover the seed for. Defaults to the `lfsr` default.
+    :param offset: Index of the first key code in the keystream.
+    :raises ValueError: If there are fewer than `MIN_CODES` codes, or too few codes to
+        determine the register, or if no parameters reproducing the keystream are found.
+    :returns: The recovered parameters.
+    """
+    if len(codes) < MIN_CODES:
+        raise ValueError(f"At least {MIN_CODES} key codes are needed to recover `lfsr` parameters. Got {len(codes)}")
+
+    polynomial = 1
+    for j in range(CODE_BITS):
+        length, connection = berlekamp_massey((codes >> j) & 1)
+        if len(codes) < 2 * length:
+            # Any longer register also reproduces the codes, so the parameters would be a guess
+            raise ValueError(
+                f"Bit {j} of the key codes needs a register of at least {length} bits, "
+                f"which takes at least {2 * length} key codes to recover. Got {len(codes)}"
+            )
+
+        polynomial = gf2_lcm(polynomial, characteristic_polynomial(length, connection))
+
+    for mask in sorted(gf2_mul(polynomial, cofactor) for cofactor in range(1, COFACTORS)):
+        if mask.bit_length() < 2:
+            continue
+
+        seed = solve_seed(codes, mask, skip=skip, offset=offset)
+        if seed is not None and verify(codes, LfsrParameters(seed, mask, skip), offset=offset):
+            return LfsrParameters(seed, mask, skip)
+
+    raise ValueError("Could not find `lfsr` parameters reproducing the keystream")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = ArgumentParser(description="Recover `lfsr` parameters from a known plain text and its cipher text.")
+    parser.add_argument("plaintext", help="File with the known plain text.")
+    parser.add_argument("ciphertext", help="File with the cipher text.")
+    parser.add_argument("--skip", type=int, default=10, help="`skip` to recover the seed for.")
+    args = parser.parse_args(argv)
+
+    with open(args.plaintext, "rb") as f, open(args.ciphertext, "rb") as g:
+        codes = keystream_codes(f.read(), g.read())
+
+    parameters = recover_lfsr(codes, skip=args.skip)
+    print(f"{parameters.seed = }, {parameters.mask = }, {parameters.skip = }")
+    print(f"Verified by regenerating {len(codes)} key codes with `lfsr`")
+
+
+if __name__ == "__main__":
+    main()
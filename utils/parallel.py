@@ -0,0 +1,226 @@
+"""
+Multi-core b64_xor encryption of large texts and files.
+
+The keystream position at any point in the input is the number of `ALPHABET` characters
+before it, so the input is split into shards, each shard's keystream offset is found with a
+prefix count, and the shards are encrypted independently in a process pool. Texts are placed
+in shared memory once, and the workers count and encrypt their shards in place, so only the
+shard bounds are sent to them. Run as a script to benchmark throughput for an increasing
+number of worker processes:
+
+    python -m utils.parallel
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+from time import perf_counter
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from utils.cipher import CHR_TABLE, Keystream, Text, count_alphabet, from_buffer, to_buffer, xor_buffer
+from utils.stream import CHUNK_SIZE, encrypt_stream
+
+# Default number of bytes per shard
+SHARD_SIZE = 16 << 20
+
+
+def _shard_ranges(size: int, shard_size: int) -> List[Tuple[int, int]]:
+    return [(start, min(start + shard_size, size)) for start in range(0, size, shard_size)]
+
+
+def _count_shared(name: str, start: int, stop: int) -> int:
+    shm = SharedMemory(name=name)
+    try:
+        shard = np.ndarray(stop - start, dtype=np.uint8, buffer=shm.buf, offset=start)
+        count = count_alphabet(shard)
+        # The view must be released before the shared memory can be closed
+        del shard
+        return count
+    finally:
+        shm.close()
+
+
+def _encrypt_shared(name: str, start: int, stop: int, offset: int, keystream_args: Dict) -> int:
+    shm = SharedMemory(name=name)
+    try:
+        shard = np.ndarray(stop - start, dtype=np.uint8, buffer=shm.buf, offset=start)
+        shard[:] = xor_buffer(shard, Keystream(position=offset, **keystream_args))
+        del shard
+        return stop - start
+    finally:
+        shm.close()
+
+
+def _count_file_range(filename: str, start: int, stop: int) -> int:
+    count = 0
+    with open(filename, "rb") as f:
+        f.seek(start)
+        while start < stop:
+            chunk = f.read(min(CHUNK_SIZE, stop - start))
+            if not chunk:
+                break
+            count += count_alphabet(chunk)
+            start += len(chunk)
+
+    return count
+
+
+class _FileRange:
+    """Binary file object limited to the byte range [start, stop) of a file."""
+
+    def __init__(self, f, stop: int):
+        self._f = f
+        self._stop = stop
+
+    def readinto(self, buffer: bytearray) -> int:
+        remaining = self._stop - self._f.tell()
+        if remaining <= 0:
+            return 0
+
+        with memoryview(buffer) as view:
+            return self._f.readinto(view[:min(len(view), remaining)])
+
+
+def _encrypt_file_range(in_file: str, out_file: str, start: int, stop: int, offset: int, keystream_args: Dict) -> int:
+    with open(in_file, "rb") as source, open(out_file, "r+b") as destination:
+        source.seek(start)
+        destination.seek(start)
+        return encrypt_stream(source=_FileRange(source, stop), destination=destination, offset=offset, **keystream_args)
+
+
+def encrypt_parallel(
+    text: Text,
+    key: Optional[str] = None,
+    keystream: Callable = None,
+    keystream_kwargs: Optional[Dict] = None,
+    workers: Optional[int] = None,
+    shard_size: int = SHARD_SIZE
+) -> Union[str, bytes]:
+    """Encrypt input text in parallel shards using b64_xor encryption. Gives the same output
+    as `utils.utils.encrypt`.
+
+    Shards start at their keystream offset in constant time for the rotating key keystream
+    and in logarithmic time for `lfsr`. Other keystream generators must be picklable, and
+    are replayed from the start for each shard.
+
+    :param text: The text to encrypt. Either a string or a bytes-like object.
+    :param key: Key to use for encrypting the text.
+        Only used with the default keystream generator.
+    :param keystream: Generator to use for generating the keystream bits.
+        Defaults to a rotating key keystream.
+    :param keystream_kwargs: Keyword arguments to the keystream generator.
+        Only necessary if `keystream` is provided.
+    :param workers: Number of worker processes. Defaults to the number of CPUs.
+    :param shard_size: Number of bytes per shard.
+    :returns: Encrypted string if `text` is a string, otherwise encrypted bytes.
+    """
+    keystream_args = {"key": key, "keystream": keystream, "keystream_kwargs": keystream_kwargs}
+    # Validate the arguments in this process, so errors are raised before starting workers
+    Keystream(**keystream_args)
+    buffer = to_buffer(text)
+    if not len(buffer):
+        return from_buffer(buffer, as_str=isinstance(text, str))
+
+    ranges = _shard_ranges(len(buffer), shard_size)
+    shm = SharedMemory(create=True, size=len(buffer))
+    try:
+        shared = np.ndarray(len(buffer), dtype=np.uint8, buffer=shm.buf)
+        shared[:] = buffer
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Count all shards in parallel first, then encrypt each shard in place
+            counts = list(executor.map(_count_shared, *zip(*[(shm.name, start, stop) for start, stop in ranges])))
+            offsets = [0, *accumulate(counts[:-1])]
+            list(executor.map(
+                _encrypt_shared,
+                *zip(*[
+                    (shm.name, start, stop, offset, keystream_args)
+                    for (start, stop), offset in zip(ranges, offsets)
+                ])
+            ))
+
+        output = from_buffer(shared, as_str=isinstance(text, str))
+        del shared
+        return output
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def encrypt_file_parallel(
+    in_file: Union[str, Path],
+    out_file: Union[str, Path],
+    key: Optional[str] = None,
+    keystream: Callable = None,
+    keystream_kwargs: Optional[Dict] = None,
+    workers: Optional[int] = None,
+    shard_size: int = SHARD_SIZE
+) -> int:
+    """Encrypt the file `in_file` in parallel shards and write the result to `out_file`.
+    Encryption preserves the byte length, so every worker writes its shard directly to its
+    position in `out_file`.
+
+    :param in_file: Path to the file to encrypt.
+    :param out_file: Path to the file to write the result to.
+    :param key: Key to use for encrypting the text.
+        Only used with the default keystream generator.
+    :param keystream: Generator to use for generating the keystream bits.
+        Defaults to a rotating key keystream.
+    :param keystream_kwargs: Keyword arguments to the keystream generator.
+        Only necessary if `keystream` is provided.
+    :param workers: Number of worker processes. Defaults to the number of CPUs.
+    :param shard_size: Number of bytes per shard.
+    :raises ValueError: If `in_file` and `out_file` are the same file.
+    :returns: Number of bytes written.
+    """
+    keystream_args = {"key": key, "keystream": keystream, "keystream_kwargs": keystream_kwargs}
+    in_file, out_file = str(in_file), str(out_file)
+    if os.path.exists(out_file) and os.path.samefile(in_file, out_file):
+        raise ValueError(f"Cannot encrypt '{in_file}' into itself, `out_file` would be truncated before it is read")
+    size = os.path.getsize(in_file)
+    ranges = _shard_ranges(size, shard_size)
+    with open(out_file, "wb") as f:
+        f.truncate(size)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        counts = list(executor.map(_count_file_range, *zip(*[(in_file, start, stop) for start, stop in ranges])))
+        offsets = [0, *accumulate(counts[:-1])]
+        written = executor.map(
+            _encrypt_file_range,
+            *zip(*[
+                (in_file, out_file, start, stop, offset, keystream_args)
+                for (start, stop), offset in zip(ranges, offsets)
+            ])
+        )
+        return sum(written)
+
+
+def benchmark(size: int = 256 << 20, max_workers: Optional[int] = None, key: str = "godJul2023") -> None:
+    """Print the throughput of `encrypt_parallel` for 1 up to `max_workers` worker processes.
+
+    :param size: Number of bytes of random text to encrypt.
+    :param max_workers: Largest number of worker processes. Defaults to the number of CPUs.
+    :param key: Key to use for encrypting the text.
+    """
+    max_workers = max_workers or os.cpu_count()
+    rng = np.random.default_rng(seed=2023)
+    text = CHR_TABLE[rng.integers(0, len(CHR_TABLE), size)].tobytes()
+    shard_size = max(size // (4 * max_workers), 1)
+
+    baseline = None
+    for workers in sorted({2 ** i for i in range(max_workers.bit_length())} | {max_workers}):
+        t = perf_counter()
+        encrypt_parallel(text, key=key, workers=workers, shard_size=shard_size)
+        elapsed = perf_counter() - t
+        baseline = baseline or elapsed
+        print(
+            f"{workers:>3} workers: {size / elapsed / 1e6:8.1f} MB/s "
+            f"(speedup {baseline / elapsed:.2f}x, efficiency {baseline / elapsed / workers:.0%})"
+        )
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,256 @@
+"""
+Cryptanalysis of `encrypt` with a repeating `key`. Each `ALPHABET` character of the text is
+XORed with the key character at its position modulo the key length, so every column of the
+text is encrypted with the same key character.
+
+Likely key lengths are ranked by the mean of the index of coincidence of the columns, which
+stays high for the correct length, and the autocorrelation of the text, which peaks at
+multiples of it. Each key character is then found by scoring all 64 candidates against the
+letter frequencies of English text. Run as a script to recover the key of a file, ex:
+
+    python -m utils.repeating_key encrypted.txt
+"""
+
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+
+from utils.cipher import CHR_TABLE, INVALID, ORD_TABLE, Text, encrypt_bulk, to_buffer
+from utils.rot import ENGLISH_FREQUENCIES
+from utils.utils import ALPHABET
+
+# Default maximum key length to try
+MAX_KEY_LENGTH = 40
+
+# Default number of key lengths to recover keys for
+CANDIDATES = 6
+
+# Key length candidates within this fraction of the best score are recovered, see `KeyLength.score`
+LENGTH_TOLERANCE = 0.85
+
+# Fraction of English letters assumed to be upper case, when no reference text is given
+UPPER_CASE_FRACTION = 0.03
+
+
+class KeyLength(NamedTuple):
+    """A scored key length.
+
+    :param length: Key length.
+    :param ioc: Mean index of coincidence of the columns.
+    :param autocorrelation: Fraction of characters equal to the character `length` positions later.
+    """
+    length: int
+    ioc: float
+    autocorrelation: float
+
+    @property
+    def score(self) -> float:
+        """Mean of the index of coincidence and the autocorrelation. Both estimate the probability
+        that two plain text codes are equal when the key length is right."""
+        return (self.ioc + self.autocorrelation) / 2
+
+
+class KeyRecovery(NamedTuple):
+    """A recovered key.
+
+    :param key: The key.
+    :param score: Mean log probability per character of the decrypted text.
+    :param ioc: Mean index of coincidence of the columns.
+    """
+    key: str
+    score: float
+    ioc: float
+
+
+def alphabet_codes(text: Text) -> np.ndarray:
+    """Get the base64 character codes of the `ALPHABET` characters in `text`, i.e. the
+    characters `encrypt` encrypts.
+
+    :param text: String or bytes-like object.
+    :returns: Array of `uint8` codes.
+    """
+    codes = ORD_TABLE[to_buffer(text)]
+    return codes[codes != INVALID]
+
+
+def reference_log_probs(reference: Optional[Text] = None) -> np.ndarray:
+    """Get the log probability of each base64 character code in plain text.
+
+    :param reference: Plain text to count the codes in. Defaults to English letter frequencies,
+        with `UPPER_CASE_FRACTION` of letters upper case.
+    :returns: Array of 64 log probabilities.
+    """
+    if reference is None:
+        frequencies = np.asarray(ENGLISH_FREQUENCIES)
+        counts = np.concatenate((
+            frequencies * UPPER_CASE_FRACTION,
+            frequencies * (1 - UPPER_CASE_FRACTION),
+            np.full(12, 1e-3)
+        ))
+    else:
+        counts = np.bincount(alphabet_codes(reference), minlength=len(ALPHABET)).astype(np.float64)
+
+    counts += 1e-4 * counts.sum()
+    return np.log(counts / counts.sum())
+
+
+def column_counts(codes: np.ndarray, length: int) -> np.ndarray:
+    """Count the codes in each column of the text for a key length.
+
+    :param codes: Cipher text codes, see `alphabet_codes`.
+    :param length: Key length.
+    :returns: Array of shape (length, 64) of counts.
+    """
+    columns = np.arange(len(codes)) % length
+    return np.bincount(columns * len(ALPHABET) + codes, minlength=length * len(ALPHABET)).reshape(length, -1)
+
+
+def index_of_coincidence(counts: np.ndarray) -> float:
+    """Get the mean index of coincidence of columns.
+
+    :param counts: Array of shape (columns, 64) of counts, see `column_counts`.
+    :returns: The mean probability that two codes drawn from the same column are equal.
+    """
+    totals = counts.sum(axis=1)
+    valid = totals > 1
+    if not valid.any():
+        return 0.0
+
+    iocs = (counts * (counts - 1)).sum(axis=1)[valid] / (totals[valid] * (totals[valid] - 1))
+    return float(iocs.mean())
+
+
+def autocorrelation(codes: np.ndarray, max_shift: int = MAX_KEY_LENGTH) -> np.ndarray:
+    """Get the fraction of codes equal to the code `shift` positions later, for each shift.
+
+    :param codes: Cipher text codes, see `alphabet_codes`.
+    :param max_shift: Largest shift.
+    :returns: Array of `max_shift + 1` fractions, where entry 0 is 1.
+    """
+    result = np.ones(max_shift + 1)
+    for shift in range(1, max_shift + 1):
+        result[shift] = np.count_nonzero(codes[:-shift] == codes[shift:]) / max(len(codes) - shift, 1)
+
+    return result
+
+
+def key_lengths(codes: np.ndarray, max_length: int = MAX_KEY_LENGTH) -> List[KeyLength]:
+    """Score all key lengths up to `max_length`.
+
+    :param codes: Cipher text codes, see `alphabet_codes`.
+    :param max_length: Longest key length to try.
+    :returns: Key lengths sorted by descending score, see `KeyLength.score`.
+    """
+    max_length = max(1, min(max_length, len(codes) // 2))
+    correlation = autocorrelation(codes, max_shift=max_length)
+    scored = [
+        KeyLength(length, index_of_coincidence(column_counts(codes, length)), float(correlation[length]))
+        for length in range(1, max_length + 1)
+    ]
+    return sorted(scored, key=lambda k: k.score, reverse=True)
+
+
+def _shortest_period(key: str) -> str:
+    for period in range(1, len(key)):
+        if len(key) % period == 0 and key == key[:period] * (len(key) // period):
+            return key[:period]
+
+    return key
+
+
+def recover_key(codes: np.ndarray, length: int, log_probs: np.ndarray) -> KeyRecovery:
+    """Recover the key of a given length. For each column, all 64 key characters are scored
+    at once, as the log probability of the column decrypted with it.
+
+    :param codes: Cipher text codes, see `alphabet_codes`.
+    :param length: Key length.
+    :param log_probs: Log probability of each plain text code, see `reference_log_probs`.
+    :returns: The recovered key, reduced to its shortest period.
+    """
+    counts = column_counts(codes, length)
+    # Entry [c, k] is the log probability of the plain text code of cipher text code c under key code k
+    symbols = np.arange(len(ALPHABET))
+    scores = counts @ log_probs[symbols[:, None] ^ symbols[None, :]]
+    key_codes = scores.argmax(axis=1)
+    key = CHR_TABLE[key_codes].tobytes().decode("ascii")
+    score = float(scores.max(axis=1).sum() / max(len(codes), 1))
+    return KeyRecovery(_shortest_period(key), score, index_of_coincidence(counts))
+
+
+def crack(
+    ciphertext: Text,
+    max_length: int = MAX_KEY_LENGTH,
+    candidates: int = CANDIDATES,
+    reference: Optional[Text] = None,
+    workers: Optional[int] = None
+) -> List[KeyRecovery]:
+    """Recover the key of a text encrypted with `encrypt` and a repeating key. Keys are
+    recovered for the most likely key lengths in a process pool, and ranked by how well the
+    decrypted text matches the reference frequencies. Multiples of the key length score as
+    well as the key length itself, so the shortest key is preferred on ties.
+
+    :param ciphertext: The encrypted text.
+    :param max_length: Longest key length to try.
+    :param candidates: Maximum number of key lengths to recover keys for.
+    :param reference: Plain text with the expected character frequencies, see `reference_log_probs`.
+    :param workers: Number of worker processes. Defaults to the number of CPUs, and 1 recovers
+        the keys in this process.
+    :returns: Recovered keys, sorted from most to least likely.
+    """
+    codes = alphabet_codes(ciphertext)
+    if not len(codes):
+        return []
+
+    scored = key_lengths(codes, max_length=max_length)
+    lengths = [k.length for k in scored if k.score >= LENGTH_TOLERANCE * scored[0].score][:candidates]
+    log_probs = reference_log_probs(reference)
+
+    args = ([codes] * len(lengths), lengths, [log_probs] * len(lengths))
+    if workers == 1:
+        recoveries = list(map(recover_key, *args))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            recoveries = list(executor.map(recover_key, *args))
+
+    unique = {r.key: r for r in sorted(recoveries, key=lambda r: r.score)}
+    return sorted(unique.values(), key=lambda r: (-round(r.score, 6), len(r.key)))
+
+
+def decrypt(ciphertext: Text, key: str) -> Text:
+    """Decrypt a text encrypted with `encrypt` and a repeating key. The cipher is its own inverse.
+
+    :param ciphertext: The encrypted text.
+    :param key: The key.
+    :returns: The decrypted text, of the same type as `ciphertext`.
+    """
+    return encrypt_bulk(ciphertext, key=key)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = ArgumentParser(description="Recover the repeating key of a text encrypted with `encrypt`.")
+    parser.add_argument("input", help="File with the encrypted text.")
+    parser.add_argument("--max-length", type=int, default=MAX_KEY_LENGTH, help="Longest key length to try.")
+    parser.add_argument("--reference", help="Plain text file with the expected character frequencies.")
+    parser.add_argument("--workers", type=int, help="Number of worker processes.")
+    args = parser.parse_args(argv)
+
+    with open(args.input, "rb") as f:
+        ciphertext = f.read()
+
+    reference = None
+    if args.reference:
+        with open(args.reference, "rb") as f:
+            reference = f.read()
+
+    recoveries = crack(ciphertext, max_length=args.max_length, reference=reference, workers=args.workers)
+    for r in recoveries:
+        print(f"key={r.key!r} length={len(r.key)} score={r.score:.4f} ioc={r.ioc:.4f}")
+
+    if recoveries:
+        print(decrypt(ciphertext[:500], recoveries[0].key).decode("utf-8", "replace"))
+
+
+if __name__ == "__main__":
+    main()
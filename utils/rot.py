@@ -0,0 +1,234 @@
+"""
+Table-driven rot (Caesar) cipher. Translation tables for all 26 shifts are built once, so
+rotating a text is a single `str.translate` or `bytes.translate` call. The sweep mode ranks all
+shifts by how English the result looks, from one count of the letters in the input, without
+building the rotated texts. Run as a script to rotate or sweep files of any size, ex:
+
+    python -m utils.rot --shift 13 secret.txt plain.txt
+    python -m utils.rot --sweep secret.txt
+"""
+
+import sys
+from argparse import ArgumentParser
+from string import ascii_lowercase, ascii_uppercase
+from typing import BinaryIO, Dict, Iterable, List, NamedTuple, Optional, Union
+
+# Default number of bytes to read per chunk when streaming
+CHUNK_SIZE = 1 << 20
+
+# Number of characters of each rotation to include in sweep results
+PREVIEW_LENGTH = 60
+
+# Relative frequency of each letter a-z in English text
+ENGLISH_FREQUENCIES = (
+    0.08167, 0.01492, 0.02782, 0.04253, 0.12702, 0.02228, 0.02015, 0.06094, 0.06966, 0.00153, 0.00772, 0.04025,
+    0.02406, 0.06749, 0.07507, 0.01929, 0.00095, 0.05987, 0.06327, 0.09056, 0.02758, 0.00978, 0.02360, 0.00150,
+    0.01974, 0.00074,
+)
+
+Text = Union[str, bytes, bytearray]
+
+
+def _rotated(alphabet: str, n: int) -> str:
+    return alphabet[n:] + alphabet[:n]
+
+
+# Translation tables for each shift, for `str.translate` and `bytes.translate`. The tables
+# that do not preserve case also map upper case letters to rotated lower case letters.
+STR_TABLES: Dict[bool, List[Dict[int, int]]] = {
+    preserve_case: [
+        str.maketrans(
+            ascii_lowercase + ascii_uppercase,
+            _rotated(ascii_lowercase, n) + (_rotated(ascii_uppercase if preserve_case else ascii_lowercase, n))
+        )
+        for n in range(26)
+    ]
+    for preserve_case in (False, True)
+}
+BYTES_TABLES: Dict[bool, List[bytes]] = {
+    preserve_case: [
+        bytes.maketrans(
+            (ascii_lowercase + ascii_uppercase).encode("ascii"),
+            (_rotated(ascii_lowercase, n) + _rotated(ascii_uppercase if preserve_case else ascii_lowercase, n))
+            .encode("ascii")
+        )
+        for n in range(26)
+    ]
+    for preserve_case in (False, True)
+}
+
+
+class Rotation(NamedTuple):
+    """A scored rotation of a text.
+
+    :param shift: Number of positions the text is rotated by.
+    :param chi_squared: Chi-squared statistic of the letter counts against English, lower
+        is more likely to be English.
+    :param preview: Start of the rotated text.
+    """
+    shift: int
+    chi_squared: float
+    preview: str
+
+
+def rot_text(text: Text, n: int, preserve_case: bool = True) -> Text:
+    """Rotate each ASCII letter in `text` by `n` positions.
+
+    :param text: String or bytes to rotate.
+    :param n: Number of positions to rotate by. Negative values rotate backwards.
+    :param preserve_case: Whether to keep upper case letters upper case. If not, all letters
+        in the output are lower case.
+    :returns: The rotated text, of the same type as `text`.
+    """
+    if isinstance(text, str):
+        return text.translate(STR_TABLES[preserve_case][n % 26])
+
+    return text.translate(BYTES_TABLES[preserve_case][n % 26])
+
+
+def letter_counts(text: Text) -> List[int]:
+    """Count the ASCII letters a-z in `text`, ignoring case.
+
+    :param text: String or bytes to count letters in.
+    :returns: List of 26 counts.
+    """
+    if isinstance(text, str):
+        text = text.encode("ascii", "ignore")
+
+    text = text.lower()
+    return [text.count(letter) for letter in ascii_lowercase.encode("ascii")]
+
+
+def chi_squared(counts: List[int]) -> float:
+    """Get the chi-squared statistic of letter counts against the English letter frequencies.
+
+    :param counts: List of 26 letter counts.
+    :returns: The statistic, or infinity if there are no letters.
+    """
+    total = sum(counts)
+    if not total:
+        return float("inf")
+
+    return sum((c - total * f) ** 2 / (total * f) for c, f in zip(counts, ENGLISH_FREQUENCIES))
+
+
+def rank_shifts(counts: List[int]) -> List[int]:
+    """Rank all 26 shifts by how English the rotated text looks. Rotating a text by `n` moves
+    the count of each letter `n` positions, so every shift is scored from the same counts.
+
+    :param counts: List of 26 letter counts of the text.
+    :returns: Shifts sorted from most to least likely.
+    """
+    return sorted(range(26), key=lambda n: chi_squared(counts[-n:] + counts[:-n] if n else counts))
+
+
+def sweep(text: Text, preview_length: int = PREVIEW_LENGTH) -> List[Rotation]:
+    """Score all 26 rotations of `text`. Only the first `preview_length` characters of each
+    rotation are built.
+
+    :param text: String or bytes to sweep.
+    :param preview_length: Number of characters of each rotation to include.
+    :returns: Rotations sorted from most to least likely to be English.
+    """
+    return sweep_counts(letter_counts(text), text[:preview_length])
+
+
+def sweep_counts(counts: List[int], preview: Text = "") -> List[Rotation]:
+    """Score all 26 rotations of a text from its letter counts, see `sweep`.
+
+    :param counts: List of 26 letter counts of the text.
+    :param preview: Start of the text, rotated for each result.
+    :returns: Rotations sorted from most to least likely to be English.
+    """
+    if not isinstance(preview, str):
+        preview = bytes(preview).decode("utf-8", "replace")
+
+    return [
+        Rotation(n, chi_squared(counts[-n:] + counts[:-n] if n else counts), rot_text(preview, n))
+        for n in rank_shifts(counts)
+    ]
+
+
+def _chunks(source: BinaryIO, chunk_size: int) -> Iterable[bytes]:
+    while chunk := source.read(chunk_size):
+        yield chunk
+
+
+def rot_stream(
+    source: BinaryIO,
+    destination: BinaryIO,
+    n: int,
+    preserve_case: bool = True,
+    chunk_size: int = CHUNK_SIZE
+) -> int:
+    """Rotate everything read from `source` and write the result to `destination`, one chunk
+    at a time. UTF-8 text can be streamed, since multibyte characters never contain ASCII bytes.
+
+    :param source: Binary file object to read from.
+    :param destination: Binary file object to write to.
+    :param n: Number of positions to rotate by.
+    :param preserve_case: Whether to keep upper case letters upper case.
+    :param chunk_size: Number of bytes to read per chunk.
+    :returns: Number of bytes written.
+    """
+    table = BYTES_TABLES[preserve_case][n % 26]
+    written = 0
+    for chunk in _chunks(source, chunk_size):
+        written += destination.write(chunk.translate(table))
+
+    return written
+
+
+def sweep_stream(
+    source: BinaryIO,
+    preview_length: int = PREVIEW_LENGTH,
+    chunk_size: int = CHUNK_SIZE
+) -> List[Rotation]:
+    """Score all 26 rotations of everything read from `source`, see `sweep`.
+
+    :param source: Binary file object to read from.
+    :param preview_length: Number of bytes from the start of the input to include in each result.
+    :param chunk_size: Number of bytes to read per chunk.
+    :returns: Rotations sorted from most to least likely to be English.
+    """
+    counts = [0] * 26
+    preview = b""
+    for chunk in _chunks(source, chunk_size):
+        if len(preview) < preview_length:
+            preview += chunk[:preview_length - len(preview)]
+
+        counts = [a + b for a, b in zip(counts, letter_counts(chunk))]
+
+    return sweep_counts(counts, preview)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = ArgumentParser(description="Rotate a file with the rot cipher, or rank all rotations of it.")
+    parser.add_argument("input", nargs="?", default="-", help="File to read from. Defaults to stdin.")
+    parser.add_argument("output", nargs="?", default="-", help="File to write to. Defaults to stdout.")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--shift", type=int, help="Number of positions to rotate by.")
+    group.add_argument("--sweep", action="store_true", help="Rank all rotations by how English they look.")
+    parser.add_argument("--lower", action="store_true", help="Output all letters in lower case.")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Number of bytes to read per chunk.")
+    args = parser.parse_args(argv)
+
+    source = sys.stdin.buffer if args.input == "-" else open(args.input, "rb")
+    try:
+        if args.sweep:
+            for r in sweep_stream(source, chunk_size=args.chunk_size):
+                print(f"shift={r.shift:2} chi_squared={r.chi_squared:10.2f} {r.preview!r}")
+        else:
+            destination = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+            try:
+                rot_stream(source, destination, args.shift, preserve_case=not args.lower, chunk_size=args.chunk_size)
+            finally:
+                if destination is not sys.stdout.buffer:
+                    destination.close()
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+
+
+if __name__ == "__main__":
+    main()
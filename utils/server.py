@@ -0,0 +1,331 @@
+"""
+Local verification server for answers and hints. The answer hashes are loaded once, and all
+hints are decrypted in one batch at startup, so tools can check answers and get hints without
+re-reading the data files in every process.
+
+The protocol is line-delimited JSON. Each request line is an object, or a list of objects to
+send a batch, and the server answers with one line per request line, ex:
+
+    {"id": 1, "op": "check", "challenge": 3, "answer": "kalleankasladrehanka"}
+    {"id": 1, "result": false}
+    [{"op": "hint", "challenge": 1, "hint": 1}, {"op": "redeem", "username": "nisse", "answers": [...]}]
+    [{"result": "..."}, {"error": "..."}]
+
+Requests from all connections go through one shared queue, and everything queued while a
+batch is handled forms the next batch. The answers of all check requests in a batch are
+grouped by challenge and hashed with one `check_many` call per challenge, against one
+snapshot of the answer hashes. The responses to the lines a connection sent together are
+written in one write. Run the server, and the load test client, with:
+
+    python -m utils.server serve --port 8765
+    python -m utils.server bench --port 8765 --connections 256 --requests 100000
+"""
+
+import asyncio
+import json
+from argparse import ArgumentParser
+from collections import defaultdict
+from time import perf_counter
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from answers import check, check_many, load_hashes, redeem_prize
+from hints import hints_all
+
+HOST = "127.0.0.1"
+PORT = 8765
+
+# Maximum length of a request line in bytes
+LINE_LIMIT = 1 << 20
+
+# Placeholder for request lines that are not valid JSON
+_INVALID = object()
+
+
+class VerificationServer:
+    """Handler for check, hint and redeem requests, with all hints decrypted once."""
+
+    def __init__(self):
+        self.hint_cache: Dict[Tuple[int, int], str] = hints_all()
+        self.queue: asyncio.Queue = asyncio.Queue()
+        # Answers checked in the current batch, and the correct ones among them, per challenge
+        self.batch_checks: Dict[int, Tuple[Set[str], Set[str]]] = {}
+
+    def check(self, challenge: int, answer: str) -> bool:
+        # Answers checked by `check_batch` are already known to have a valid challenge
+        checked, correct = self.batch_checks.get(challenge, ((), ()))
+        if answer in checked:
+            return answer in correct
+
+        if not 1 <= challenge <= len(load_hashes()):
+            raise ValueError(f"The challenge number you provided ({challenge}) does not exist")
+
+        return check(challenge, answer, _print=False)
+
+    def check_batch(self, requests: List[Any]) -> Dict[int, Tuple[Set[str], Set[str]]]:
+        """Check the answers of all check requests in a batch, with one `check_many` call per
+        challenge. Malformed requests are skipped here, and answered by `handle`.
+
+        :param requests: Request objects.
+        :returns: Dict mapping challenges to (answers checked, correct answers).
+        """
+        answers = defaultdict(set)
+        for request in requests:
+            if isinstance(request, dict) and request.get("op") == "check":
+                challenge, answer = request.get("challenge"), request.get("answer")
+                if isinstance(challenge, int) and isinstance(answer, str):
+                    answers[challenge].add(answer)
+
+        try:
+            num_challenges = len(load_hashes())
+        except OSError:
+            # Every check request gets the error from `handle`
+            return {}
+
+        return {
+            challenge: (checked, set(check_many(challenge, list(checked), workers=1)))
+            for challenge, checked in answers.items() if 1 <= challenge <= num_challenges
+        }
+
+    def hint(self, challenge: int, hint: int = 1) -> str:
+        if (challenge, hint) not in self.hint_cache:
+            raise ValueError(f"Could not find hint {hint} for challenge {challenge}.")
+
+        return self.hint_cache[challenge, hint]
+
+    def redeem(self, username: str, answers: List[str]) -> Optional[str]:
+        if not isinstance(answers, list) or not all(isinstance(a, str) for a in answers):
+            raise ValueError("`answers` must be a list of strings")
+
+        num_challenges = len(load_hashes())
+        if len(answers) != num_challenges:
+            raise ValueError(f"There are {num_challenges} challenges, but you provided {len(answers)} answers.")
+
+        return redeem_prize(username, answers, _print=False)
+
+    def handle(self, request: Any) -> Dict[str, Any]:
+        """Handle one request object, and get the response object."""
+        response = {"id": request.get("id")} if isinstance(request, dict) and "id" in request else {}
+        try:
+            if not isinstance(request, dict):
+                raise ValueError("A request must be a JSON object")
+
+            op = request.get("op")
+            if op == "check":
+                result = self.check(int(request["challenge"]), str(request["answer"]))
+            elif op == "hint":
+                result = self.hint(int(request["challenge"]), int(request.get("hint", 1)))
+            elif op == "redeem":
+                result = self.redeem(str(request["username"]), request["answers"])
+            else:
+                raise ValueError(f"Unknown op: {op!r}")
+
+            response["result"] = result
+
+        except KeyError as e:
+            response["error"] = f"Missing field: {e.args[0]}"
+        except (TypeError, ValueError) as e:
+            response["error"] = str(e)
+        except OSError as e:
+            response["error"] = f"Could not read the answer data: {e}"
+        except RecursionError:
+            response["error"] = "The request is nested too deeply"
+
+        return response
+
+    def handle_batch(self, lines: List[bytes]) -> List[bytes]:
+        """Handle request lines as one batch, see `check_batch`, and get the response lines."""
+        parsed = []
+        for line in lines:
+            try:
+                parsed.append(json.loads(line))
+            except (ValueError, RecursionError):
+                parsed.append(_INVALID)
+
+        self.batch_checks = self.check_batch([r for p in parsed for r in (p if isinstance(p, list) else [p])])
+        try:
+            return [self._response_line(request) for request in parsed]
+        finally:
+            self.batch_checks = {}
+
+    def _response_line(self, request: Any) -> bytes:
+        if request is _INVALID:
+            response = {"error": "Invalid JSON"}
+        else:
+            response = [self.handle(r) for r in request] if isinstance(request, list) else self.handle(request)
+
+        try:
+            return json.dumps(response, separators=(",", ":")).encode("utf-8") + b"\n"
+        except RecursionError:
+            # A deeply nested request id is echoed in the response
+            return b'{"error":"The request is nested too deeply"}\n'
+
+    def handle_line(self, line: bytes) -> bytes:
+        """Handle one request line, and get the response line."""
+        return self.handle_batch([line])[0]
+
+    async def run_batches(self) -> None:
+        """Handle the queued request lines of all connections in batches, until cancelled."""
+        while True:
+            batch = [await self.queue.get()]
+            while not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+
+            batch = [(line, future) for line, future in batch if not future.done()]
+            try:
+                responses = self.handle_batch([line for line, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future), response in zip(batch, responses):
+                future.set_result(response)
+
+    def submit(self, line: bytes) -> asyncio.Future:
+        """Queue a request line for the next batch, see `run_batches`.
+
+        :returns: Future of the response line.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((line, future))
+        return future
+
+    async def serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        buffer = b""
+        try:
+            while chunk := await reader.read(1 << 16):
+                # Queue all complete lines received so far, and answer them in one write
+                *lines, buffer = (buffer + chunk).split(b"\n")
+                if len(buffer) > LINE_LIMIT:
+                    break
+
+                responses = await asyncio.gather(*(self.submit(line) for line in lines if line.strip()))
+                if responses:
+                    writer.write(b"".join(responses))
+                    await writer.drain()
+
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(host: str = HOST, port: int = PORT, unix_path: Optional[str] = None) -> None:
+    """Run the verification server until it is cancelled.
+
+    :param host: Host to listen on.
+    :param port: TCP port to listen on.
+    :param unix_path: Path to a Unix socket to listen on, instead of TCP.
+    """
+    server = VerificationServer()
+    batches = asyncio.create_task(server.run_batches())
+    if unix_path is not None:
+        listener = await asyncio.start_unix_server(server.serve_client, path=unix_path)
+    else:
+        listener = await asyncio.start_server(server.serve_client, host=host, port=port)
+
+    addresses = ", ".join(str(s.getsockname()) for s in listener.sockets)
+    print(f"Serving on {addresses}")
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        batches.cancel()
+
+
+async def _open_connection(host: str, port: int, unix_path: Optional[str]):
+    if unix_path is not None:
+        return await asyncio.open_unix_connection(unix_path, limit=LINE_LIMIT)
+
+    return await asyncio.open_connection(host, port, limit=LINE_LIMIT)
+
+
+async def _bench_client(
+    host: str,
+    port: int,
+    unix_path: Optional[str],
+    requests: List[bytes],
+    latencies: List[float]
+) -> None:
+    reader, writer = await _open_connection(host, port, unix_path)
+    try:
+        for request in requests:
+            start = perf_counter()
+            writer.write(request)
+            await writer.drain()
+            await reader.readline()
+            latencies.append(perf_counter() - start)
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def bench(
+    host: str = HOST,
+    port: int = PORT,
+    unix_path: Optional[str] = None,
+    connections: int = 64,
+    n_requests: int = 10000
+) -> Dict[str, float]:
+    """Load test a running server with concurrent connections, each sending one request at a
+    time, and report the latency percentiles and throughput. Requests are a mix of checks and hints.
+
+    :param host: Host the server listens on.
+    :param port: TCP port the server listens on.
+    :param unix_path: Path to the Unix socket the server listens on, instead of TCP.
+    :param connections: Number of concurrent connections.
+    :param n_requests: Total number of requests to send.
+    :returns: Dict with the keys "p50_ms", "p99_ms" and "requests_per_second".
+    """
+    requests = [
+        json.dumps({"id": i, "op": "check", "challenge": i % 5 + 1, "answer": f"guess{i}"}).encode() + b"\n"
+        if i % 2 else json.dumps({"id": i, "op": "hint", "challenge": i % 5 + 1, "hint": 1}).encode() + b"\n"
+        for i in range(n_requests)
+    ]
+    latencies = []
+    start = perf_counter()
+    await asyncio.gather(*(
+        _bench_client(host, port, unix_path, requests[i::connections], latencies) for i in range(connections)
+    ))
+    elapsed = perf_counter() - start
+
+    latencies.sort()
+    return {
+        "p50_ms": 1000 * latencies[len(latencies) // 2],
+        "p99_ms": 1000 * latencies[min(len(latencies) * 99 // 100, len(latencies) - 1)],
+        "requests_per_second": len(latencies) / elapsed,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = ArgumentParser(description="Local verification server for answers and hints.")
+    parser.add_argument("command", choices=("serve", "bench"), help="Run the server, or load test a running server.")
+    parser.add_argument("--host", default=HOST, help="Host to listen on or connect to.")
+    parser.add_argument("--port", type=int, default=PORT, help="TCP port to listen on or connect to.")
+    parser.add_argument("--unix", help="Path to a Unix socket to use instead of TCP.")
+    parser.add_argument("--connections", type=int, default=64, help="Number of concurrent load test connections.")
+    parser.add_argument("--requests", type=int, default=10000, help="Total number of load test requests.")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        try:
+            asyncio.run(serve(host=args.host, port=args.port, unix_path=args.unix))
+        except KeyboardInterrupt:
+            pass
+    else:
+        stats = asyncio.run(bench(
+            host=args.host,
+            port=args.port,
+            unix_path=args.unix,
+            connections=args.connections,
+            n_requests=args.requests
+        ))
+        print(
+            f"{args.requests} requests over {args.connections} connections: "
+            f"p50={stats['p50_ms']:.2f} ms, p99={stats['p99_ms']:.2f} ms, "
+            f"{stats['requests_per_second']:.0f} requests/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
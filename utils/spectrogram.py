@@ -0,0 +1,404 @@
+"""
+Streaming spectrograms of long WAV files. Samples are read through a memory map in chunks,
+and the short-time Fourier transform is computed one block of frames at a time, so the input
+buffers are bounded by the chunk and window sizes instead of the length of the recording. The
+output still holds 1 + n_fft // 2 `float32` values per output frame, about 1.3 GB per hour of
+44.1 kHz audio with the default parameters, so use `time_decimation` for long recordings.
+
+With the default parameters the result matches
+`librosa.amplitude_to_db(np.abs(librosa.stft(y)), ref=np.max)` for the same samples. This only
+holds at the native sample rate: the streaming resampler differs from `librosa.load` with
+`sr=22050` by up to 33 dB in single bins, and 9.5 dB at the 99th percentile.
+
+Spectrograms of a whole directory can be rendered to PNG files in worker processes. Computed
+spectrograms are cached on disk by file content and STFT parameters, so only new or changed
+files are computed again, ex:
+
+    python -m utils.spectrogram recordings --out spectrograms
+"""
+
+import json
+import os
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import sha256
+from math import ceil, gcd
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from utils.wav import CHUNK_FRAMES, float_chunks, read_wav_info
+
+N_FFT = 2048
+HOP_LENGTH = 512
+TOP_DB = 80.0
+AMIN = 1e-5
+
+
+def hann_window(n_fft: int) -> np.ndarray:
+    """Periodic Hann window, the default window of `librosa.stft`.
+
+    :param n_fft: Window length.
+    :returns: Array of `float32` window weights.
+    """
+    return (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(n_fft) / n_fft)).astype(np.float32)
+
+
+def resample_chunks(chunks: Iterable[np.ndarray], orig_sr: int, target_sr: int) -> Iterator[np.ndarray]:
+    """Resample a stream of mono chunks with polyphase filtering (`scipy.signal.resample_poly`).
+    Each segment is filtered together with enough neighbouring samples to cover the filter,
+    so the output equals resampling the whole signal at once.
+
+    :param chunks: Mono `float32` chunks at `orig_sr`.
+    :param orig_sr: Sample rate of the input.
+    :param target_sr: Sample rate of the output.
+    :yields: Mono `float32` chunks at `target_sr`.
+    """
+    from scipy.signal import resample_poly
+
+    g = gcd(orig_sr, target_sr)
+    up, down = target_sr // g, orig_sr // g
+    # Input samples on each side of a segment covered by the filter, rounded up to whole phases
+    margin = ceil((10 * max(up, down) + 1) / up / down) * down
+    segment = down * max(1, CHUNK_FRAMES // down)
+
+    buffer = np.zeros(margin, dtype=np.float32)
+    total_in = produced = 0
+    for chunk in chunks:
+        total_in += len(chunk)
+        buffer = np.concatenate((buffer, chunk))
+        while len(buffer) >= 2 * margin + segment:
+            out = resample_poly(buffer[:2 * margin + segment], up, down)
+            yield out[margin * up // down:(margin + segment) * up // down].astype(np.float32)
+            produced += segment * up // down
+            buffer = buffer[segment:]
+
+    remaining = len(buffer) - margin
+    if remaining > 0:
+        padded_length = 2 * margin + ceil(remaining / down) * down
+        buffer = np.concatenate((buffer, np.zeros(padded_length - len(buffer), dtype=np.float32)))
+        out = resample_poly(buffer, up, down)
+        start = margin * up // down
+        yield out[start:start + ceil(total_in * up / down) - produced].astype(np.float32)
+
+
+def stft_magnitude(
+    chunks: Iterable[np.ndarray],
+    n_fft: int = N_FFT,
+    hop_length: int = HOP_LENGTH
+) -> Iterator[np.ndarray]:
+    """Compute the magnitude of the centered short-time Fourier transform of a stream of mono
+    chunks, like `np.abs(librosa.stft(y, n_fft=n_fft, hop_length=hop_length))`.
+
+    :param chunks: Mono `float32` chunks.
+    :param n_fft: Window length.
+    :param hop_length: Number of samples between frames.
+    :yields: Arrays of shape (1 + n_fft // 2, frames) of `float32` magnitudes.
+    """
+    window = hann_window(n_fft)
+    # The signal is centered by padding `n_fft // 2` zeros on both sides
+    buffer = np.zeros(n_fft // 2, dtype=np.float32)
+
+    def frames(samples: np.ndarray) -> Tuple[np.ndarray, int]:
+        if len(samples) < n_fft:
+            return np.empty((1 + n_fft // 2, 0), dtype=np.float32), 0
+
+        n_frames = (len(samples) - n_fft) // hop_length + 1
+        windows = np.lib.stride_tricks.sliding_window_view(samples, n_fft)[::hop_length][:n_frames]
+        magnitude = np.abs(np.fft.rfft(windows * window, axis=1)).astype(np.float32).T
+        return magnitude, n_frames * hop_length
+
+    for chunk in chunks:
+        buffer = np.concatenate((buffer, chunk))
+        magnitude, consumed = frames(buffer)
+        if consumed:
+            yield magnitude
+            buffer = buffer[consumed:]
+
+    magnitude, consumed = frames(np.concatenate((buffer, np.zeros(n_fft // 2, dtype=np.float32))))
+    if consumed:
+        yield magnitude
+
+
+def amplitude_to_db(magnitude: np.ndarray, amin: float = AMIN, top_db: Optional[float] = TOP_DB) -> np.ndarray:
+    """Convert magnitudes to dB relative to the maximum magnitude, in place.
+    Same as `librosa.amplitude_to_db(magnitude, ref=np.max, amin=amin, top_db=top_db)`.
+
+    :param magnitude: Array of magnitudes. Overwritten with the result.
+    :param amin: Minimum magnitude, to avoid taking the logarithm of zero.
+    :param top_db: Clip the result to at most `top_db` below the maximum.
+    :returns: The `magnitude` array, converted to dB.
+    """
+    ref_db = 20 * np.log10(max(amin, float(magnitude.max(initial=0))))
+    np.maximum(magnitude, amin, out=magnitude)
+    np.log10(magnitude, out=magnitude)
+    magnitude *= 20
+    magnitude -= ref_db
+    if top_db is not None and magnitude.size:
+        np.maximum(magnitude, magnitude.max() - top_db, out=magnitude)
+
+    return magnitude
+
+
+def spectrogram(
+    soundfile: Union[str, Path],
+    n_fft: int = N_FFT,
+    hop_length: int = HOP_LENGTH,
+    sample_rate: Optional[int] = None,
+    time_decimation: int = 1,
+    chunk_frames: int = CHUNK_FRAMES
+) -> Tuple[np.ndarray, int, int]:
+    """Compute the dB spectrogram of a WAV file by streaming it in chunks. Only the input is
+    streamed, the whole output is kept in memory.
+
+    :param soundfile: Path to the WAV file.
+    :param n_fft: Window length.
+    :param hop_length: Number of samples between frames.
+    :param sample_rate: Sample rate to resample to before the transform.
+        Uses the native sample rate of the file by default.
+    :param time_decimation: Keep the maximum of every `time_decimation` consecutive frames,
+        to reduce the size of spectrograms of long recordings.
+    :param chunk_frames: Number of frames to read from the file per chunk.
+    :returns: Tuple of (dB spectrogram of shape (1 + n_fft // 2, frames) as `float32`,
+        sample rate, number of samples between output frames).
+    """
+    info = read_wav_info(soundfile)
+    chunks = float_chunks(soundfile, chunk_frames=chunk_frames)
+    n_samples = info.n_frames
+    if sample_rate and sample_rate != info.sample_rate:
+        chunks = resample_chunks(chunks, orig_sr=info.sample_rate, target_sr=sample_rate)
+        n_samples = ceil(info.n_frames * sample_rate / info.sample_rate)
+    else:
+        sample_rate = info.sample_rate
+
+    n_frames = n_samples // hop_length + 1
+    output = np.zeros((1 + n_fft // 2, ceil(n_frames / time_decimation)), dtype=np.float32)
+    t = 0
+    for magnitude in stft_magnitude(chunks, n_fft=n_fft, hop_length=hop_length):
+        groups = np.arange(t, t + magnitude.shape[1]) // time_decimation
+        starts = np.flatnonzero(np.diff(groups, prepend=-1))
+        reduced = np.maximum.reduceat(magnitude, starts, axis=1)
+        output[:, groups[starts]] = np.maximum(output[:, groups[starts]], reduced)
+        t += magnitude.shape[1]
+
+    return amplitude_to_db(output), sample_rate, hop_length * time_decimation
+
+
+def file_hash(filename: Union[str, Path]) -> str:
+    """Get the SHA-256 hex digest of the content of a file, read in chunks.
+
+    :param filename: Path to the file.
+    :returns: Hex digest.
+    """
+    digest = sha256()
+    with open(filename, "rb") as f:
+        while chunk := f.read(1 << 20):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def cache_key(
+    content_hash: str,
+    n_fft: int = N_FFT,
+    hop_length: int = HOP_LENGTH,
+    sample_rate: Optional[int] = None,
+    time_decimation: int = 1
+) -> str:
+    """Get the cache key of a spectrogram from the file content hash and STFT parameters.
+
+    :param content_hash: Content hash of the sound file, see `file_hash`.
+    :param n_fft: Window length.
+    :param hop_length: Number of samples between frames.
+    :param sample_rate: Sample rate to resample to before the transform.
+    :param time_decimation: Number of frames combined into one.
+    :returns: Hex digest identifying the spectrogram.
+    """
+    params = f"{content_hash}:{n_fft}:{hop_length}:{sample_rate}:{time_decimation}"
+    return sha256(params.encode("utf-8")).hexdigest()
+
+
+def cached_spectrogram(
+    soundfile: Union[str, Path],
+    cache_dir: Union[str, Path],
+    n_fft: int = N_FFT,
+    hop_length: int = HOP_LENGTH,
+    sample_rate: Optional[int] = None,
+    time_decimation: int = 1,
+    content_hash: Optional[str] = None
+) -> Tuple[np.ndarray, int, int, str]:
+    """Same as `spectrogram`, but load the result from `cache_dir` if it has been computed
+    for the same file content and parameters before, and store it there otherwise.
+
+    :param soundfile: Path to the WAV file.
+    :param cache_dir: Directory of cached spectrograms.
+    :param n_fft: Window length.
+    :param hop_length: Number of samples between frames.
+    :param sample_rate: Sample rate to resample to before the transform.
+    :param time_decimation: Keep the maximum of every `time_decimation` consecutive frames.
+    :param content_hash: Known content hash of `soundfile`, see `file_hash`.
+    :returns: Tuple of (dB spectrogram, sample rate, number of samples between output frames, cache key).
+    """
+    key = cache_key(content_hash or file_hash(soundfile), n_fft, hop_length, sample_rate, time_decimation)
+    cache_file = Path(cache_dir).joinpath(f"{key}.npz")
+    if cache_file.is_file():
+        with np.load(cache_file) as cached:
+            return cached["s_db"], int(cached["sample_rate"]), int(cached["hop_length"]), key
+
+    s_db, sample_rate, hop_length = spectrogram(
+        soundfile, n_fft=n_fft, hop_length=hop_length, sample_rate=sample_rate, time_decimation=time_decimation
+    )
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp_file, "wb") as f:
+        np.savez(f, s_db=s_db, sample_rate=sample_rate, hop_length=hop_length)
+    os.replace(tmp_file, cache_file)
+
+    return s_db, sample_rate, hop_length, key
+
+
+def render_png(
+    s_db: np.ndarray,
+    sample_rate: int,
+    hop_length: int,
+    out_file: Union[str, Path],
+    title: str = ""
+) -> None:
+    """Render a dB spectrogram to a PNG file without an interactive window.
+
+    :param s_db: dB spectrogram of shape (frequencies, frames).
+    :param sample_rate: Sample rate of the spectrogram.
+    :param hop_length: Number of samples between frames.
+    :param out_file: PNG file to write to.
+    :param title: Title of the plot.
+    """
+    # Figures created without pyplot are drawn with the non-interactive Agg canvas
+    from matplotlib.figure import Figure
+
+    fig = Figure()
+    ax = fig.subplots()
+    img = ax.imshow(
+        s_db,
+        origin="lower",
+        aspect="auto",
+        cmap="magma",
+        extent=(0, s_db.shape[1] * hop_length / sample_rate, 0, sample_rate / 2)
+    )
+    ax.set(title=title or "Spectrogram", xlabel="Time (s)", ylabel="Hz")
+    fig.colorbar(img, ax=ax, format="%+2.f dB")
+    fig.savefig(out_file)
+
+
+def _render_file(
+    soundfile: Path,
+    out_file: Path,
+    cache_dir: Path,
+    content_hash: Optional[str],
+    rendered_key: Optional[str],
+    params: Dict
+) -> Tuple[str, str]:
+    content_hash = content_hash or file_hash(soundfile)
+    key = cache_key(content_hash, **params)
+    if key != rendered_key or not out_file.is_file():
+        s_db, sample_rate, hop_length, key = cached_spectrogram(
+            soundfile, cache_dir=cache_dir, content_hash=content_hash, **params
+        )
+        out_file.parent.mkdir(parents=True, exist_ok=True)
+        render_png(s_db, sample_rate=sample_rate, hop_length=hop_length, out_file=out_file, title=soundfile.name)
+
+    return content_hash, key
+
+
+def render_directory(
+    directory: Union[str, Path],
+    out_dir: Union[str, Path],
+    cache_dir: Optional[Union[str, Path]] = None,
+    n_fft: int = N_FFT,
+    hop_length: int = HOP_LENGTH,
+    sample_rate: Optional[int] = None,
+    time_decimation: int = 1,
+    workers: Optional[int] = None
+) -> List[Path]:
+    """Render spectrogram PNGs of all WAV files in `directory` in worker processes.
+
+    The content hash of each file is remembered by size and modification time in an index in
+    `cache_dir`, so unchanged files are neither hashed, computed nor rendered again.
+
+    :param directory: Directory to search for WAV files, recursively.
+    :param out_dir: Directory to write `<file stem>.png` files to.
+    :param cache_dir: Directory of cached spectrograms. Defaults to `out_dir/.cache`.
+    :param n_fft: Window length.
+    :param hop_length: Number of samples between frames.
+    :param sample_rate: Sample rate to resample to before the transform.
+    :param time_decimation: Keep the maximum of every `time_decimation` consecutive frames.
+    :param workers: Number of worker processes. Defaults to the number of CPUs.
+    :returns: List of the PNG files.
+    """
+    out_dir = Path(out_dir)
+    cache_dir = Path(cache_dir) if cache_dir else out_dir.joinpath(".cache")
+    index_file = cache_dir.joinpath("index.json")
+    index = json.loads(index_file.read_text()) if index_file.is_file() else {"files": {}, "renders": {}}
+    params = {"n_fft": n_fft, "hop_length": hop_length, "sample_rate": sample_rate, "time_decimation": time_decimation}
+
+    soundfiles = sorted(p.resolve() for p in Path(directory).rglob("*") if p.suffix.lower() == ".wav")
+    out_files = [out_dir.joinpath(p.relative_to(Path(directory).resolve()).with_suffix(".png")) for p in soundfiles]
+    content_hashes = []
+    for soundfile in soundfiles:
+        stat = soundfile.stat()
+        entry = index["files"].get(str(soundfile), {})
+        unchanged = entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns
+        content_hashes.append(entry["hash"] if unchanged else None)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(
+            _render_file,
+            soundfiles,
+            out_files,
+            [cache_dir] * len(soundfiles),
+            content_hashes,
+            [index["renders"].get(str(out_file)) for out_file in out_files],
+            [params] * len(soundfiles)
+        ))
+
+    for soundfile, out_file, (content_hash, key) in zip(soundfiles, out_files, results):
+        stat = soundfile.stat()
+        index["files"][str(soundfile)] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "hash": content_hash}
+        index["renders"][str(out_file)] = key
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    tmp_file = index_file.with_suffix(".tmp")
+    tmp_file.write_text(json.dumps(index, indent=1))
+    os.replace(tmp_file, index_file)
+
+    return out_files
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = ArgumentParser(description="Render spectrogram PNGs of all WAV files in a directory.")
+    parser.add_argument("directory", help="Directory to search for WAV files.")
+    parser.add_argument("--out", default="spectrograms", help="Directory to write PNG files to.")
+    parser.add_argument("--cache", help="Directory of cached spectrograms. Defaults to OUT/.cache.")
+    parser.add_argument("--n-fft", type=int, default=N_FFT, help="Window length.")
+    parser.add_argument("--hop-length", type=int, default=HOP_LENGTH, help="Number of samples between frames.")
+    parser.add_argument("--sample-rate", type=int, help="Sample rate to resample to.")
+    parser.add_argument("--time-decimation", type=int, default=1, help="Number of frames to combine into one.")
+    parser.add_argument("--workers", type=int, help="Number of worker processes.")
+    args = parser.parse_args(argv)
+
+    out_files = render_directory(
+        args.directory,
+        out_dir=args.out,
+        cache_dir=args.cache,
+        n_fft=args.n_fft,
+        hop_length=args.hop_length,
+        sample_rate=args.sample_rate,
+        time_decimation=args.time_decimation,
+        workers=args.workers
+    )
+    for out_file in out_files:
+        print(out_file)
+
+
+if __name__ == "__main__":
+    main()
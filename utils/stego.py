@@ -0,0 +1,391 @@
+"""
+Sweep images for hidden LSB data. An image is decoded once, and every combination of channel
+selection, bit plane and traversal order is extracted and scored for printable text, known
+file signatures and entropy. Run as a script to print a ranked report for one or more images:
+
+    python -m utils.stego challenges/challenge5/nothing_to_see_here.jpg
+"""
+
+import mmap
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+from utils.carve import FILE_SIGNATURES
+
+# Traversal orders. "column" matches `read_image_lsb_data`, (0, 0), (0, 1), ..., while "row"
+# reads the image line by line, (0, 0), (1, 0), ...
+ORDERS = ("column", "row")
+
+# Default number of bytes from the start of each stream to score
+SAMPLE_SIZE = 4096
+
+# PIL raw modes that can be read directly from the file, mapped to the byte index of each image
+# channel within a pixel. The pixel size in bytes is the length of the raw mode.
+RAW_LAYOUTS = {
+    "L": (0,),
+    "RGB": (0, 1, 2),
+    "RGBX": (0, 1, 2),
+    "RGBA": (0, 1, 2, 3),
+    "BGR": (2, 1, 0),
+    "BGRX": (2, 1, 0),
+    "BGRA": (2, 1, 0, 3),
+}
+
+_PRINTABLE = np.zeros(256, dtype=bool)
+_PRINTABLE[[9, 10, 13, *range(32, 127)]] = True
+
+
+class Candidate(NamedTuple):
+    """A scored LSB stream.
+
+    :param channels: Channel indices read from each pixel, in order.
+    :param bit: Bit plane, where 0 is the least significant bit.
+    :param order: Traversal order, one of `ORDERS`.
+    :param printable: Fraction of printable ASCII bytes in the sample.
+    :param signature: Name of the file signature the stream starts with, if any.
+    :param entropy: Shannon entropy of the sample in bits per byte.
+    :param score: Combined score, higher is more likely to contain data.
+    :param preview: First bytes of the stream.
+    """
+    channels: Tuple[int, ...]
+    bit: int
+    order: str
+    printable: float
+    signature: Optional[str]
+    entropy: float
+    score: float
+    preview: bytes
+
+
+def load_pixels(filename: str) -> np.ndarray:
+    """Decode an image into an array of shape (height, width, channels).
+
+    :param filename: Path to the image file.
+    :returns: Array of pixel values.
+    """
+    with Image.open(filename) as img:
+        pixels = np.asarray(img)
+
+    return pixels[:, :, None] if pixels.ndim == 2 else pixels
+
+
+def _raw_strips(img: Image.Image) -> Optional[List[Tuple[int, int, int, int, int, str]]]:
+    """Get the layout of uncompressed images (ex. BMP, PPM and uncompressed TIFF), where the
+    pixel data can be read directly from the file.
+
+    :returns: List of (first row, last row + 1, file offset, row stride, orientation, raw mode)
+        for each strip of full-width rows, or `None` if the image is not stored that way.
+    """
+    width, _ = img.size
+    strips = []
+    for tile in img.tile:
+        codec_name, (x0, y0, x1, y1), offset, args = tile
+        rawmode, stride, orientation = (args, 0, 1) if isinstance(args, str) else (tuple(args) + (0, 1))[:3]
+        if codec_name != "raw" or rawmode not in RAW_LAYOUTS or (x0, x1) != (0, width):
+            return None
+        elif len(RAW_LAYOUTS[rawmode]) != len(img.getbands()):
+            return None
+
+        strips.append((y0, y1, offset, stride or width * len(rawmode), orientation, rawmode))
+
+    return strips or None
+
+
+def _mapped_columns(filename: str, strips: List[Tuple], channel: int, x0: int, x1: int, height: int) -> np.ndarray:
+    """Read one channel of the pixel columns [x0, x1) through `mmap`, touching only those columns."""
+    columns = np.empty((x1 - x0, height), dtype=np.uint8)
+    with open(filename, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for y0, y1, offset, stride, orientation, rawmode in strips:
+            pixel_size = len(rawmode)
+            rows = np.frombuffer(mm, dtype=np.uint8, count=(y1 - y0) * stride, offset=offset).reshape(-1, stride)
+            strip = rows[::orientation, x0 * pixel_size + RAW_LAYOUTS[rawmode][channel]:x1 * pixel_size:pixel_size]
+            columns[:, y0:y1] = strip.T
+            del rows, strip
+
+    return columns
+
+
+def read_lsb_window(
+    filename: str,
+    channel: int = 0,
+    start: int = 0,
+    stop: Optional[int] = None,
+    bit: int = 0
+) -> np.ndarray:
+    """Read the bits [start, stop) of a bit plane in column order, the same order as
+    `read_image_lsb_data`. Bit `i` is in the pixel (i // height, i % height), so only the pixel
+    columns covering the window are read. Uncompressed images are read through `mmap` without
+    decoding the rest of the image, other formats are decoded and then sliced.
+
+    Image formats store pixels row by row, so a column window still spans every row. For
+    uncompressed BMP and TIFF files, the mapped bytes of the columns are in every row, so
+    unless a row is several pages wide, every page of pixel data is still read from disk.
+    PNG and other compressed formats decode every row up to the bottom of the image, since
+    cropping happens after decoding. The I/O and decoding cost is therefore not
+    proportional to the window size. Only the number of pixels copied and unpacked is.
+
+    :param filename: Path to the image file.
+    :param channel: Which channel to read.
+    :param start: Index of the first bit to read.
+    :param stop: Index to stop reading at. Reads to the end of the image by default.
+    :param bit: Bit plane to read, where 0 is the least significant bit.
+    :raises ValueError: If the image does not have the channel `channel`.
+    :returns: Array of `uint8` bits.
+    """
+    with Image.open(filename) as img:
+        width, height = img.size
+        n_channels = len(img.getbands())
+        if channel >= n_channels:
+            raise ValueError(f"The image only has {n_channels} channel(s), cannot read channel '{channel}'.")
+
+        total = width * height
+        start, stop = max(0, min(start, total)), min(stop or total, total)
+        if start >= stop:
+            return np.empty(0, dtype=np.uint8)
+
+        x0, x1 = start // height, (stop - 1) // height + 1
+        strips = _raw_strips(img)
+        if strips is None:
+            pixels = np.asarray(img.crop((x0, 0, x1, height)))
+            pixels = pixels[:, :, None] if pixels.ndim == 2 else pixels
+            columns = pixels[:, :, channel].T
+
+    if strips is not None:
+        columns = _mapped_columns(filename, strips, channel=channel, x0=x0, x1=x1, height=height)
+
+    window = columns.ravel()[start - x0 * height:stop - x0 * height]
+    return ((window >> bit) & 1).astype(np.uint8, copy=False)
+
+
+def channel_selections(n_channels: int) -> List[Tuple[int, ...]]:
+    """Get the channel selections to sweep: every single channel, all color channels
+    interleaved per pixel, and all channels including alpha interleaved per pixel.
+
+    :param n_channels: Number of channels in the image.
+    :returns: List of tuples of channel indices.
+    """
+    selections = [(c,) for c in range(n_channels)]
+    if n_channels >= 3:
+        selections.append((0, 1, 2))
+    if n_channels == 4:
+        selections.append((0, 1, 2, 3))
+
+    return selections
+
+
+def _ordered(pixels: np.ndarray, order: str) -> np.ndarray:
+    """Get pixels as an array of shape (number of pixels, channels) in traversal order."""
+    if order == "column":
+        pixels = pixels.transpose(1, 0, 2)
+
+    return pixels.reshape(-1, pixels.shape[2])
+
+
+def _extract(ordered: np.ndarray, channels: Tuple[int, ...], bit: int, max_bytes: Optional[int]) -> bytes:
+    """Extract a bit plane from pixels already in traversal order, see `extract_stream`."""
+    if max_bytes is not None:
+        ordered = ordered[:-(-max_bytes * 8 // len(channels))]
+
+    bits = (ordered[:, list(channels)].ravel() >> bit) & 1
+    packed = np.packbits(bits.astype(np.uint8, copy=False))
+    return packed[:max_bytes].tobytes()
+
+
+def extract_stream(
+    pixels: np.ndarray,
+    channels: Tuple[int, ...],
+    bit: int = 0,
+    order: str = "column",
+    max_bytes: Optional[int] = None
+) -> bytes:
+    """Extract one bit plane from the selected channels as packed bytes.
+
+    :param pixels: Array of shape (height, width, channels), see `load_pixels`.
+    :param channels: Channel indices to read from each pixel, in order.
+    :param bit: Bit plane to read, where 0 is the least significant bit.
+    :param order: Traversal order, one of `ORDERS`.
+    :param max_bytes: Only extract this many bytes from the start of the stream.
+    :returns: Packed bits, most significant bit first.
+    """
+    return _extract(_ordered(pixels, order), channels=channels, bit=bit, max_bytes=max_bytes)
+
+
+def _embed_plane(plane: np.ndarray, first: int, bits: np.ndarray, bit: int) -> None:
+    """Write bits into one bit plane of a 2D view, where pixel `i` is plane[i // width, i % width].
+    Whole lines of the view are written as one 2D block, and partial lines at either end as 1D slices."""
+    lines, width = plane.shape
+    keep = plane.dtype.type(~(1 << bit) & np.iinfo(plane.dtype).max)
+    values = bits.astype(plane.dtype, copy=False) << plane.dtype.type(bit)
+
+    def write(view: np.ndarray, block: np.ndarray) -> None:
+        view &= keep
+        view |= block
+
+    line, column = divmod(first, width)
+    done = 0
+    if column and len(values):
+        done = min(width - column, len(values))
+        write(plane[line, column:column + done], values[:done])
+        line += 1
+
+    full_lines = (len(values) - done) // width
+    if full_lines:
+        write(plane[line:line + full_lines], values[done:done + full_lines * width].reshape(full_lines, width))
+        line += full_lines
+        done += full_lines * width
+
+    if done < len(values):
+        write(plane[line, :len(values) - done], values[done:])
+
+
+def embed_stream(
+    pixels: np.ndarray,
+    data: Union[bytes, bytearray, memoryview, np.ndarray],
+    channels: Tuple[int, ...] = (0,),
+    bit: int = 0,
+    order: str = "column",
+    start: int = 0
+) -> int:
+    """Write data into one bit plane of the selected channels, in place. The inverse of
+    `extract_stream`: bit `start + k` of the stream is written to channel `channels[k % n]` of
+    the `(start + k) // n`-th pixel in traversal order, where n is the number of channels. In
+    column order with a single channel, this is the order `read_image_lsb_data` reads in.
+
+    Each channel is written through a strided view of the image, a block of whole pixel columns
+    (or rows) at a time, so no index arrays or copies of the image are made.
+
+    :param pixels: Array of shape (height, width, channels), see `load_pixels`. Must be writable.
+    :param data: Bytes of packed bits, most significant bit first, or an array of 0/1 bits,
+        ex. from `string_to_lsb_bits` for other char sizes.
+    :param channels: Channel indices to write to in each pixel, in order.
+    :param bit: Bit plane to write, where 0 is the least significant bit.
+    :param order: Traversal order, one of `ORDERS`.
+    :param start: Index of the first stream bit to write.
+    :raises ValueError: If the arguments are invalid, or the data does not fit in the image.
+    :returns: Index of the stream bit after the last written bit.
+    """
+    if order not in ORDERS:
+        raise ValueError(f"`order` must be one of {ORDERS}. Got {order = }")
+    elif not 0 <= bit < pixels.dtype.itemsize * 8:
+        raise ValueError(f"Cannot write bit plane {bit} of {pixels.dtype} pixels")
+    elif not channels or not all(0 <= c < pixels.shape[2] for c in channels):
+        raise ValueError(f"The image has {pixels.shape[2]} channel(s), cannot write {channels = }")
+
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8))
+    else:
+        bits = np.asarray(data, dtype=np.uint8) & 1
+
+    n = len(channels)
+    stop = start + len(bits)
+    if start < 0 or stop > pixels.shape[0] * pixels.shape[1] * n:
+        raise ValueError(
+            f"Cannot write bits [{start}, {stop}), the image holds {pixels.shape[0] * pixels.shape[1] * n} bits "
+            f"in {channels = }"
+        )
+
+    for j, channel in enumerate(channels):
+        # The first stream bit at or after `start` that goes to this channel
+        first = start + (j - start) % n
+        # Pixel i of the traversal order is plane[i // width, i % width]
+        plane = pixels[:, :, channel].T if order == "column" else pixels[:, :, channel]
+        _embed_plane(plane, first // n, bits[first - start::n], bit)
+
+    return stop
+
+
+def score_stream(sample: bytes) -> Tuple[float, Optional[str], float, float]:
+    """Score a stream sample for hidden data.
+
+    :param sample: Bytes from the start of the stream.
+    :returns: Tuple of (printable fraction, file signature name or `None`,
+        entropy in bits per byte, combined score).
+    """
+    data = np.frombuffer(sample, dtype=np.uint8)
+    if not len(data):
+        return 0.0, None, 0.0, 0.0
+
+    printable = float(_PRINTABLE[data].mean())
+    signature = next((name for name, magic in FILE_SIGNATURES.items() if sample.startswith(magic)), None)
+    counts = np.bincount(data, minlength=256)
+    p = counts[counts > 0] / len(data)
+    entropy = float(-(p * np.log2(p)).sum())
+
+    # Constant streams (entropy 0) are empty planes, not data
+    score = (printable if entropy > 0 else 0.0) + (1.0 if signature else 0.0) + 0.25 * (1 - entropy / 8)
+    return printable, signature, entropy, score
+
+
+def sweep_pixels(
+    pixels: np.ndarray,
+    sample_size: int = SAMPLE_SIZE,
+    bits: Iterable[int] = range(8)
+) -> List[Candidate]:
+    """Score every channel selection, bit plane and traversal order of an image.
+
+    :param pixels: Array of shape (height, width, channels), see `load_pixels`.
+    :param sample_size: Number of bytes from the start of each stream to score.
+    :param bits: Bit planes to sweep.
+    :returns: Candidates sorted by descending score.
+    """
+    candidates = []
+    for order in ORDERS:
+        ordered = _ordered(pixels, order)
+        for channels in channel_selections(pixels.shape[2]):
+            for bit in bits:
+                sample = _extract(ordered, channels=channels, bit=bit, max_bytes=sample_size)
+                candidates.append(Candidate(channels, bit, order, *score_stream(sample), preview=sample[:32]))
+
+    return sorted(candidates, key=lambda c: c.score, reverse=True)
+
+
+def sweep_image(filename: str, sample_size: int = SAMPLE_SIZE) -> List[Candidate]:
+    """Decode an image once, and score all its LSB streams. See `sweep_pixels`.
+
+    :param filename: Path to the image file.
+    :param sample_size: Number of bytes from the start of each stream to score.
+    :returns: Candidates sorted by descending score.
+    """
+    return sweep_pixels(load_pixels(filename), sample_size=sample_size)
+
+
+def sweep_images(
+    filenames: Iterable[str],
+    sample_size: int = SAMPLE_SIZE,
+    workers: Optional[int] = None
+) -> Dict[str, List[Candidate]]:
+    """Sweep many images in a process pool.
+
+    :param filenames: Paths to the image files.
+    :param sample_size: Number of bytes from the start of each stream to score.
+    :param workers: Number of worker processes. Defaults to the number of CPUs.
+    :returns: Dict mapping each filename to its ranked candidates.
+    """
+    filenames = list(filenames)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(sweep_image, filenames, [sample_size] * len(filenames))
+        return dict(zip(filenames, results))
+
+
+def print_report(results: Dict[str, List[Candidate]], top: int = 10) -> None:
+    """Print the `top` candidates for each image.
+
+    :param results: Dict mapping filenames to ranked candidates, see `sweep_images`.
+    :param top: Number of candidates to print per image.
+    """
+    for filename, candidates in results.items():
+        print(f"{filename}:")
+        for c in candidates[:top]:
+            print(
+                f"  score={c.score:.3f} channels={c.channels} bit={c.bit} order={c.order} "
+                f"printable={c.printable:.2f} entropy={c.entropy:.2f} "
+                f"signature={c.signature} preview={c.preview!r}"
+            )
+
+
+if __name__ == "__main__":
+    print_report(sweep_images(sys.argv[1:]))
@@ -0,0 +1,128 @@
+"""
+Streaming b64_xor encryption of files with bounded memory.
+
+The input is read in chunks, and the keystream position is carried across chunk boundaries,
+so the output is identical to `utils.utils.encrypt` on the whole input. Run as a script to
+encrypt or decrypt files or stdin/stdout, ex:
+
+    python -m utils.stream --key secret plain.txt encrypted.txt
+    python -m utils.stream --seed 1337 --mask 9001 < encrypted.txt
+"""
+
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, List, Optional, Union
+
+import numpy as np
+
+from utils.cipher import Keystream, xor_buffer
+from utils.utils import lfsr
+
+# Default number of bytes to read per chunk
+CHUNK_SIZE = 1 << 20
+
+
+def encrypt_stream(
+    source: BinaryIO,
+    destination: BinaryIO,
+    key: Optional[str] = None,
+    keystream: Callable = None,
+    keystream_kwargs: Optional[Dict] = None,
+    chunk_size: int = CHUNK_SIZE,
+    offset: int = 0
+) -> int:
+    """Encrypt everything read from `source` and write the result to `destination`,
+    one chunk at a time.
+
+    :param source: Binary file object to read from.
+    :param destination: Binary file object to write to.
+    :param key: Key to use for encrypting the text.
+        Only used with the default keystream generator.
+    :param keystream: Generator to use for generating the keystream bits.
+        Defaults to a rotating key keystream.
+    :param keystream_kwargs: Keyword arguments to the keystream generator.
+        Only necessary if `keystream` is provided.
+    :param chunk_size: Number of bytes to read per chunk.
+    :param offset: Keystream position of the first `ALPHABET` character in `source`.
+    :returns: Number of bytes written.
+    """
+    _keystream = Keystream(key=key, keystream=keystream, keystream_kwargs=keystream_kwargs, position=offset)
+    chunk = bytearray(chunk_size)
+    written = 0
+    while True:
+        n = source.readinto(chunk)
+        if not n:
+            break
+
+        destination.write(xor_buffer(np.frombuffer(chunk, dtype=np.uint8, count=n), _keystream).data)
+        written += n
+
+    return written
+
+
+def encrypt_file(
+    in_file: Union[str, Path],
+    out_file: Union[str, Path],
+    key: Optional[str] = None,
+    keystream: Callable = None,
+    keystream_kwargs: Optional[Dict] = None,
+    chunk_size: int = CHUNK_SIZE
+) -> int:
+    """Encrypt the file `in_file` and write the result to `out_file`.
+
+    :param in_file: Path to the file to encrypt.
+    :param out_file: Path to the file to write the result to.
+    :param key: Key to use for encrypting the text.
+        Only used with the default keystream generator.
+    :param keystream: Generator to use for generating the keystream bits.
+        Defaults to a rotating key keystream.
+    :param keystream_kwargs: Keyword arguments to the keystream generator.
+        Only necessary if `keystream` is provided.
+    :param chunk_size: Number of bytes to read per chunk.
+    :returns: Number of bytes written.
+    """
+    with open(in_file, "rb") as source, open(out_file, "wb") as destination:
+        return encrypt_stream(
+            source=source,
+            destination=destination,
+            key=key,
+            keystream=keystream,
+            keystream_kwargs=keystream_kwargs,
+            chunk_size=chunk_size
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = ArgumentParser(description="Encrypt or decrypt a file with b64_xor encryption.")
+    parser.add_argument("input", nargs="?", default="-", help="File to read from. Defaults to stdin.")
+    parser.add_argument("output", nargs="?", default="-", help="File to write to. Defaults to stdout.")
+    parser.add_argument("--key", help="Key for the rotating key keystream.")
+    parser.add_argument("--seed", type=int, help="Seed for the `lfsr` keystream.")
+    parser.add_argument("--mask", type=int, help="Mask for the `lfsr` keystream.")
+    parser.add_argument("--skip", type=int, default=10, help="Skip for the `lfsr` keystream.")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Number of bytes to read per chunk.")
+    args = parser.parse_args(argv)
+
+    if (args.key is None) == (args.seed is None or args.mask is None):
+        parser.error("provide either --key, or both --seed and --mask")
+
+    keystream_args = {"key": args.key}
+    if args.key is None:
+        keystream_args = {
+            "keystream": lfsr,
+            "keystream_kwargs": {"seed": args.seed, "mask": args.mask, "skip": args.skip}
+        }
+
+    source = sys.stdin.buffer if args.input == "-" else open(args.input, "rb")
+    destination = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    try:
+        encrypt_stream(source=source, destination=destination, chunk_size=args.chunk_size, **keystream_args)
+    finally:
+        for f in (source, destination):
+            if f not in (sys.stdin.buffer, sys.stdout.buffer):
+                f.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""
+Automatic solver for monoalphabetic substitution ciphers. Candidate keys are scored by the log
+probability of the English quadgrams (groups of four letters) in the decrypted text, and the
+key is improved by hill climbing, swapping two letters at a time. Only the quadgrams touching
+the swapped letters are scored again, and independent restarts run in a process pool.
+
+The quadgram statistics in `data/english_quadgrams.txt` can be rebuilt from any English text,
+ex. a collection of books, for better results:
+
+    python -m utils.substitution --build book1.txt book2.txt
+    python -m utils.substitution ciphertext.txt
+"""
+
+import random
+import re
+from argparse import ArgumentParser
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from string import ascii_lowercase
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+QUADGRAM_FILEPATH = Path(__file__).parent.parent.joinpath("data/english_quadgrams.txt")
+
+# Default number of hill climbing restarts
+RESTARTS = 8
+
+# Number of consecutive passes over all swaps without improvement before a climb stops
+PATIENCE = 1
+
+# Index of each letter in a quadgram table index, most significant letter first
+_PLACES = np.array([26 ** 3, 26 ** 2, 26, 1], dtype=np.int64)
+
+
+def build_quadgram_file(corpus_files: Sequence[Union[str, Path]], out_file: Union[str, Path] = QUADGRAM_FILEPATH) -> int:
+    """Count the quadgrams in English text files, and write them to a quadgram file, one
+    upper case quadgram and its count per line.
+
+    :param corpus_files: Paths to English text files.
+    :param out_file: Path to write the quadgram file to.
+    :returns: Number of distinct quadgrams written.
+    """
+    counts = Counter()
+    for filename in corpus_files:
+        with open(filename, 'r', encoding="utf-8", errors="ignore") as f:
+            letters = re.sub("[^a-z]", "", f.read().lower())
+        counts.update(letters[i:i + 4] for i in range(len(letters) - 3))
+
+    with open(out_file, 'w') as f:
+        f.write(f"# English quadgram counts from: {', '.join(Path(c).name for c in corpus_files)}\n")
+        for quadgram, count in counts.most_common():
+            f.write(f"{quadgram.upper()} {count}\n")
+
+    return len(counts)
+
+
+@lru_cache(maxsize=None)
+def load_quadgrams(quadgram_filepath: Path = QUADGRAM_FILEPATH) -> np.ndarray:
+    """Load a quadgram file into a table of log10 probabilities. Quadgrams that do not occur
+    in the file get the log probability of a count of 0.01.
+
+    :param quadgram_filepath: Path to the quadgram file, see `build_quadgram_file`.
+    :raises FileNotFoundError: If the file does not exist.
+    :returns: Array of 26^4 log probabilities, indexed by the letters of the quadgram in base 26.
+    """
+    counts = np.zeros(26 ** 4, dtype=np.float64)
+    with open(quadgram_filepath, 'r') as f:
+        for line in f:
+            if line.startswith('#'):
+                continue
+
+            quadgram, count = line.split()
+            index = sum(p * (ord(c) - ord('A')) for p, c in zip(_PLACES.tolist(), quadgram))
+            counts[index] = int(count)
+
+    total = counts.sum()
+    counts[counts == 0] = 0.01
+    return np.log10(counts / total)
+
+
+def letter_indices(text: str) -> np.ndarray:
+    """Get the letters a-z of `text` as indices 0-25, ignoring case and all other characters.
+
+    :param text: Input text.
+    :returns: Array of `uint8` letter indices.
+    """
+    data = np.frombuffer(text.lower().encode("ascii", "ignore"), dtype=np.uint8)
+    return data[(data >= ord('a')) & (data <= ord('z'))] - ord('a')
+
+
+def frequency_key(letters: np.ndarray) -> np.ndarray:
+    """Get the key mapping the most frequent cipher letters to the most frequent English letters.
+
+    :param letters: Cipher letter indices, see `letter_indices`.
+    :returns: Array where entry `c` is the plaintext letter index of cipher letter `c`.
+    """
+    english_order = [ascii_lowercase.index(c) for c in "etaoinshrdlcumwfgypbvkjxqz"]
+    cipher_order = np.argsort(-np.bincount(letters, minlength=26), kind="stable")
+    key = np.empty(26, dtype=np.int64)
+    key[cipher_order] = english_order
+    return key
+
+
+class QuadgramScorer:
+    """Quadgram score of a cipher text under a key, updated incrementally when two key
+    entries are swapped. Each distinct cipher quadgram is scored once and weighted by its
+    count, so long texts cost little more than short ones.
+
+    :param letters: Cipher letter indices, see `letter_indices`.
+    :param table: Quadgram log probabilities, see `load_quadgrams`.
+    """
+
+    def __init__(self, letters: np.ndarray, table: np.ndarray):
+        self.table = table
+        windows = np.lib.stride_tricks.sliding_window_view(letters.astype(np.int64), 4)
+        self.quadgrams, counts = np.unique(windows, axis=0, return_counts=True)
+        self.weights = counts.astype(np.float64)
+        # Indices of the distinct quadgrams containing each cipher letter, and each pair of letters
+        letter_positions = [np.flatnonzero((self.quadgrams == c).any(axis=1)) for c in range(26)]
+        self.positions = {
+            (a, b): np.union1d(letter_positions[a], letter_positions[b])
+            for a in range(26) for b in range(a + 1, 26)
+        }
+        self.key = None
+        self.scores = None
+
+    def set_key(self, key: np.ndarray) -> float:
+        """Score all quadgrams under `key`.
+
+        :param key: Array mapping cipher letter indices to plaintext letter indices.
+        :returns: Total log probability.
+        """
+        self.key = key.copy()
+        self.scores = self.table[self.key[self.quadgrams] @ _PLACES] * self.weights
+        return float(self.scores.sum())
+
+    def try_swap(self, a: int, b: int) -> Tuple[float, np.ndarray, np.ndarray]:
+        """Score the key with the entries of cipher letters `a` and `b` swapped, without
+        applying it. `a` must be less than `b`.
+
+        :returns: Tuple of (change in total log probability, affected quadgrams, their new scores).
+        """
+        positions = self.positions[a, b]
+        key = self.key.copy()
+        key[a], key[b] = key[b], key[a]
+        new_scores = self.table[key[self.quadgrams[positions]] @ _PLACES] * self.weights[positions]
+        return float(new_scores.sum() - self.scores[positions].sum()), positions, new_scores
+
+    def swap(self, a: int, b: int, positions: np.ndarray, new_scores: np.ndarray) -> None:
+        """Apply a swap scored with `try_swap`."""
+        self.key[a], self.key[b] = self.key[b], self.key[a]
+        self.scores[positions] = new_scores
+
+
+def hill_climb(
+    letters: np.ndarray,
+    key: np.ndarray,
+    table: np.ndarray,
+    rng: random.Random,
+    patience: int = PATIENCE
+) -> Tuple[float, np.ndarray]:
+    """Improve `key` by swapping pairs of cipher letters, keeping swaps that raise the score,
+    until `patience` passes over all pairs in a row bring no improvement.
+
+    :param letters: Cipher letter indices, see `letter_indices`.
+    :param key: Initial key.
+    :param table: Quadgram log probabilities, see `load_quadgrams`.
+    :param rng: Random number generator deciding the order of the swaps.
+    :param patience: Number of passes without improvement before stopping.
+    :returns: Tuple of (score, key).
+    """
+    scorer = QuadgramScorer(letters, table)
+    score = scorer.set_key(key)
+    # Swapping two letters that do not occur in the text never changes the score
+    present = np.flatnonzero(np.bincount(letters, minlength=26)).tolist()
+    pairs = [(a, b) for a in range(26) for b in range(a + 1, 26) if a in present or b in present]
+
+    passes_without_improvement = 0
+    while passes_without_improvement < patience:
+        improved = False
+        rng.shuffle(pairs)
+        for a, b in pairs:
+            delta, positions, new_scores = scorer.try_swap(a, b)
+            if delta > 1e-9:
+                scorer.swap(a, b, positions, new_scores)
+                score += delta
+                improved = True
+
+        passes_without_improvement = 0 if improved else passes_without_improvement + 1
+
+    return score, scorer.key
+
+
+def _climb_restart(letters: np.ndarray, restart: int, seed: Optional[int], quadgram_filepath: Path) -> Tuple[float, List[int]]:
+    """Run one restart: restart 0 starts from the frequency key, and later restarts start from
+    the frequency key with random swaps."""
+    rng = random.Random(None if seed is None else seed + restart)
+    key = frequency_key(letters)
+    for _ in range(restart * 4):
+        a, b = rng.sample(range(26), 2)
+        key[a], key[b] = key[b], key[a]
+
+    score, key = hill_climb(letters, key, load_quadgrams(quadgram_filepath), rng=rng)
+    return score, key.tolist()
+
+
+def solve(
+    ciphertext: str,
+    restarts: int = RESTARTS,
+    workers: Optional[int] = None,
+    seed: Optional[int] = None,
+    quadgram_filepath: Path = QUADGRAM_FILEPATH
+) -> Tuple[Dict[str, str], float]:
+    """Find the substitution key of a cipher text, by hill climbing from several starting keys.
+
+    :param ciphertext: Text encrypted with a monoalphabetic substitution cipher.
+    :param restarts: Number of independent hill climbs.
+    :param workers: Number of worker processes. Defaults to the number of CPUs, and 1 runs
+        the restarts in this process.
+    :param seed: Seed for the random number generators, for reproducible results.
+    :param quadgram_filepath: Path to the quadgram file, see `build_quadgram_file`.
+    :returns: Tuple of (mapping from each cipher letter in the text to its plaintext letter,
+        score as the total log10 probability of the quadgrams).
+    """
+    letters = letter_indices(ciphertext)
+    if len(letters) < 4:
+        raise ValueError("The cipher text must contain at least 4 letters")
+
+    args = ([letters] * restarts, range(restarts), [seed] * restarts, [quadgram_filepath] * restarts)
+    if workers == 1:
+        results = list(map(_climb_restart, *args))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_climb_restart, *args))
+
+    score, key = max(results, key=lambda r: r[0])
+    present = sorted(set(letters.tolist()))
+    return {ascii_lowercase[c]: ascii_lowercase[key[c]] for c in present}, score
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = ArgumentParser(description="Solve a substitution cipher, or build the quadgram statistics.")
+    parser.add_argument("inputs", nargs="+", help="File with the cipher text, or English text files with --build.")
+    parser.add_argument("--build", action="store_true", help="Build the quadgram file from the input files.")
+    parser.add_argument("--restarts", type=int, default=RESTARTS, help="Number of hill climbing restarts.")
+    parser.add_argument("--workers", type=int, help="Number of worker processes.")
+    args = parser.parse_args(argv)
+
+    if args.build:
+        print(f"Wrote {build_quadgram_file(args.inputs)} quadgrams to {QUADGRAM_FILEPATH}")
+        return
+
+    with open(args.inputs[0], 'r') as f:
+        ciphertext = f.read()
+
+    char_map, score = solve(ciphertext, restarts=args.restarts, workers=args.workers)
+    print(f"{score = :.1f}")
+    print(f"{char_map = }")
+    print(ciphertext.lower().translate(str.maketrans(char_map)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
+import re
+import sys
 from sys import platform
-if platform in ["cygwin", "win32"]:
-    import colorama
-    colorama.init()
+from typing import Callable, Dict, Iterable, Optional, TextIO
 
 # ANSI text formatting
 END = "\033[0m"
@@ -23,38 +23,102 @@ BRIGHT_YELLOW_BG = "\033[103m"
 BRIGHT_BLUE_BG = "\033[104m"
 BRIGHT_MAGENTA_BG = "\033[105m"
 
+_colorama_initialized = False
+
+
+def enable_ansi() -> None:
+    """Enable ANSI text formatting in Windows terminals. Colorama is only
+    imported the first time colored text is created, to keep importing
+    this module fast.
+    """
+    global _colorama_initialized
+    if not _colorama_initialized and platform in ["cygwin", "win32"]:
+        import colorama
+        colorama.init()
+
+    _colorama_initialized = True
+
 
 def black(text: str) -> str:
+    enable_ansi()
     return BLACK + text + END
 
 
 def red(text: str) -> str:
+    enable_ansi()
     return RED + text + END
 
 
 def green(text: str) -> str:
+    enable_ansi()
     return GREEN + text + END
 
 
 def yellow(text: str) -> str:
+    enable_ansi()
     return YELLOW + text + END
 
 
 def blue(text: str) -> str:
+    enable_ansi()
     return BLUE + text + END
 
 
 def bright_red(text: str) -> str:
+    enable_ansi()
     return BRIGHT_RED + text + END
 
 
 def bright_green(text: str) -> str:
+    enable_ansi()
     return BRIGHT_GREEN + text + END
 
 
 def bright_yellow(text: str) -> str:
+    enable_ansi()
     return BRIGHT_YELLOW + text + END
 
 
 def bright_blue(text: str) -> str:
+    enable_ansi()
     return BRIGHT_BLUE + text + END
+
+
+def color_runs(
+    text: str,
+    chars: Iterable[str],
+    color: Callable[[str], str] = bright_blue,
+    table: Optional[Dict[int, str]] = None
+) -> str:
+    """Color every run of consecutive characters from `chars` in `text` with one escape
+    sequence, instead of one per character.
+
+    :param text: Text to color.
+    :param chars: Characters to color.
+    :param color: Color function, ex. `bright_blue`.
+    :param table: Translation table, see `str.maketrans`, to apply to the colored runs.
+    :returns: The colored text.
+    """
+    chars = "".join(chars)
+    if not chars:
+        return text
+
+    def color_run(match: re.Match) -> str:
+        run = match.group()
+        return color(run.translate(table) if table else run)
+
+    return re.sub(f"[{re.escape(chars)}]+", color_run, text)
+
+
+def write(*parts: str, sep: str = " ", end: str = "\n", file: Optional[TextIO] = None) -> None:
+    """Print like `print`, but join the parts first, and write them to the terminal in one
+    buffered write.
+
+    :param parts: Strings to write.
+    :param sep: String inserted between the parts.
+    :param end: String appended after the last part.
+    :param file: File to write to. Defaults to `sys.stdout`.
+    """
+    file = sys.stdout if file is None else file
+    file.write(sep.join(parts) + end)
+    file.flush()
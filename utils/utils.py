@@ -1,6 +1,10 @@
 from pathlib import Path
 from string import digits, ascii_lowercase, ascii_uppercase
-from typing import Any, Callable, Collection, Dict, Iterator, List, Optional
+from typing import TYPE_CHECKING, Any, Callable, Collection, Dict, Iterator, List, Optional, Union
+
+if TYPE_CHECKING:
+    # NumPy is imported where it is used, to keep importing this module fast
+    import numpy as np
 
 try:
     from utils.text_formatting import yellow
@@ -71,24 +75,102 @@ def chunker(sequence: Collection[Any], size: int) -> Iterator[List[Any]]:
         yield sequence[pos:pos + size]
 
 
-def lsb_bits_to_string(data: List[int], char_size: int = 8) -> str:
+def unpack_bits(
+    data: Union[List[int], "np.ndarray", bytes, bytearray, memoryview],
+    bit_count: Optional[int] = None
+) -> "np.ndarray":
+    """Get LSB data as an array with one bit per element.
+
+    :param data: Either a sequence of 0/1 ints, or bytes-like packed bits as returned by
+        `np.packbits`, with the first bit in the most significant bit of each byte.
+    :param bit_count: Number of bits in packed `data`, if the last byte is zero-padded.
+    :returns: Array of `uint8` bits.
+    """
+    import numpy as np
+
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return np.unpackbits(np.frombuffer(data, dtype=np.uint8), count=bit_count)
+
+    return np.asarray(data, dtype=np.uint8)
+
+
+def lsb_bits_to_string(
+    data: Union[List[int], "np.ndarray", bytes, bytearray, memoryview],
+    char_size: int = 8,
+    bit_order: str = "big",
+    bit_count: Optional[int] = None
+) -> str:
     """Decode binary LSB data retrieved from image, and return
     string containing decoded data.
 
-    :param data: Binary encoded LSB data.
+    :param data: Binary encoded LSB data. Either a list or array of bits,
+        or bytes-like packed bits (see `unpack_bits`).
     :param char_size: number of bits used for representing a char.
         Default size is 8 bits per char.
+    :param bit_order: Order of the bits within each char. Either "big"
+        (most significant bit first) or "little" (least significant bit first).
+    :param bit_count: Number of bits in packed `data`, if the last byte is zero-padded.
+    :raises ValueError: If `bit_order` is invalid.
     :returns: String of decoded LSB data.
     """
-    output = ''
-    for byte in chunker(sequence=data, size=char_size):
-        char = 0
-        for bit in byte:
-            char = (char << 1) | bit
+    if bit_order not in ("big", "little"):
+        raise ValueError(f"`bit_order` must be either 'big' or 'little'. Got {bit_order = }")
+
+    packed = isinstance(data, (bytes, bytearray, memoryview))
+    if packed and char_size == 8 and bit_order == "big" and (bit_count is None or bit_count % 8 == 0):
+        # The packed bytes are the chars
+        return bytes(memoryview(data)[:None if bit_count is None else bit_count // 8]).decode("latin-1")
+
+    import numpy as np
+
+    bits = unpack_bits(data=data, bit_count=bit_count) if packed else np.asarray(data, dtype=np.uint8)
+    weights = 1 << np.arange(char_size, dtype=np.int64)
+    if bit_order == "big":
+        weights = weights[::-1]
+
+    # Chars from all complete chunks of `char_size` bits
+    full = len(bits) // char_size * char_size
+    chars = bits[:full].reshape(-1, char_size) @ weights
+
+    # A trailing incomplete chunk is decoded from the bits it has
+    remainder = bits[full:]
+    if len(remainder):
+        tail_weights = 1 << np.arange(len(remainder), dtype=np.int64)
+        if bit_order == "big":
+            tail_weights = tail_weights[::-1]
+        chars = np.append(chars, remainder @ tail_weights)
+
+    if char_size <= 8:
+        return chars.astype(np.uint8).tobytes().decode("latin-1")
+
+    return chars.astype("<u4").tobytes().decode("utf-32-le", "surrogatepass")
+
+
+def string_to_lsb_bits(string: str, char_size: int = 8, bit_order: str = "big") -> "np.ndarray":
+    """Encode a string as LSB data, the inverse of `lsb_bits_to_string`.
+
+    :param string: String to encode.
+    :param char_size: number of bits used for representing a char.
+        Default size is 8 bits per char.
+    :param bit_order: Order of the bits within each char. Either "big"
+        (most significant bit first) or "little" (least significant bit first).
+    :raises ValueError: If `bit_order` is invalid, or a char does not fit in `char_size` bits.
+    :returns: Array of `uint8` bits, `char_size` bits per char.
+    """
+    if bit_order not in ("big", "little"):
+        raise ValueError(f"`bit_order` must be either 'big' or 'little'. Got {bit_order = }")
+
+    import numpy as np
+
+    chars = np.frombuffer(string.encode("utf-32-le", "surrogatepass"), dtype="<u4").astype(np.int64)
+    if len(chars) and int(chars.max()) >> char_size:
+        raise ValueError(f"All chars must fit in {char_size = } bits. Got {chr(chars.max())!r}")
 
-        output += chr(char)
+    shifts = np.arange(char_size, dtype=np.int64)
+    if bit_order == "big":
+        shifts = shifts[::-1]
 
-    return output
+    return ((chars[:, None] >> shifts) & 1).astype(np.uint8).ravel()
 
 
 def b64_xor(str1: str, str2: str) -> Optional[str]:
@@ -128,6 +210,30 @@ def clean_string(string: str) -> str:
     return clean_str
 
 
+def validate_keystream_args(
+    key: Optional[str] = None,
+    keystream: Callable = None,
+    keystream_kwargs: Optional[Dict] = None
+) -> None:
+    """Check that a valid combination of `key`, `keystream` and `keystream_kwargs` is given.
+
+    :param key: Key to use for encrypting the text.
+    :param keystream: Generator to use for generating the keystream bits.
+    :param keystream_kwargs: Keyword arguments to the keystream generator.
+    :raises ValueError: If both `key` and `keystream` are `None`,
+        if `keystream` is provided, but not `keystream_kwargs`,
+        or if `keystream_kwargs` is provided, but not `keystream`.
+    """
+    if key is None and keystream is None:
+        raise ValueError("`key` and `keystream` cannot both be `None`")
+    elif keystream is not None and keystream_kwargs is None:
+        raise ValueError(
+            f"`keystream_kwargs` must be provided if `keystream` is provided. Got {keystream = }, {keystream_kwargs = }"
+        )
+    elif keystream is None and keystream_kwargs is not None:
+        raise ValueError(f"`keystream_kwargs` cannot be provided when `keystream` is not provided")
+
+
 def encrypt(
     text: str,
     key: Optional[str] = None,
@@ -149,14 +255,7 @@ def encrypt(
     :returns: Encrypted string.
     """
 
-    if key is None and keystream is None:
-        raise ValueError("`key` and `keystream` cannot both be `None`")
-    elif keystream is not None and keystream_kwargs is None:
-        raise ValueError(
-            f"`keystream_kwargs` must be provided if `keystream` is provided. Got {keystream = }, {keystream_kwargs = }"
-        )
-    elif keystream is None and keystream_kwargs is not None:
-        raise ValueError(f"`keystream_kwargs` cannot be provided when `keystream` is not provided")
+    validate_keystream_args(key=key, keystream=keystream, keystream_kwargs=keystream_kwargs)
 
     def default_keystream_generator():
         """Get the next key char"""
@@ -0,0 +1,252 @@
+"""
+Memory-mapped access to the samples of uncompressed WAV files, without decoding the whole
+file into memory. Includes LSB extraction from the sample bit planes, the audio counterpart of
+`read_image_lsb_data`.
+"""
+
+from pathlib import Path
+from typing import Iterator, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# Supported combinations of format tag and sample width in bytes
+SUPPORTED_FORMATS = {
+    (WAVE_FORMAT_PCM, 1),
+    (WAVE_FORMAT_PCM, 2),
+    (WAVE_FORMAT_PCM, 3),
+    (WAVE_FORMAT_PCM, 4),
+    (WAVE_FORMAT_IEEE_FLOAT, 4),
+    (WAVE_FORMAT_IEEE_FLOAT, 8),
+}
+
+# Default number of frames per chunk when streaming samples
+CHUNK_FRAMES = 1 << 16
+
+
+class WavInfo(NamedTuple):
+    """Layout of the sample data in a WAV file.
+
+    :param format_tag: `WAVE_FORMAT_PCM` for integer samples or `WAVE_FORMAT_IEEE_FLOAT`.
+    :param channels: Number of channels.
+    :param sample_rate: Number of frames per second.
+    :param sample_width: Number of bytes per sample.
+    :param data_offset: Offset of the first sample in the file.
+    :param n_frames: Number of frames, where each frame holds one sample per channel.
+    """
+    format_tag: int
+    channels: int
+    sample_rate: int
+    sample_width: int
+    data_offset: int
+    n_frames: int
+
+
+def read_wav_info(filename: Union[str, Path]) -> WavInfo:
+    """Read the `fmt ` and `data` chunk headers of a WAV file.
+
+    :param filename: Path to the WAV file.
+    :raises ValueError: If the file is not an uncompressed PCM or IEEE float WAV file.
+    :returns: Layout of the sample data.
+    """
+    fmt = None
+    with open(filename, "rb") as f:
+        header = f.read(12)
+        if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+            raise ValueError(f"'{filename}' is not a WAV file")
+
+        while True:
+            chunk_header = f.read(8)
+            if len(chunk_header) < 8:
+                raise ValueError(f"'{filename}' has no data chunk")
+
+            chunk_id, chunk_size = chunk_header[:4], int.from_bytes(chunk_header[4:], "little")
+            if chunk_id == b"fmt ":
+                fmt = f.read(chunk_size)
+                f.seek(chunk_size % 2, 1)
+            elif chunk_id == b"data":
+                data_offset = f.tell()
+                data_size = min(chunk_size, f.seek(0, 2) - data_offset)
+                break
+            else:
+                # Chunks are padded to an even number of bytes
+                f.seek(chunk_size + chunk_size % 2, 1)
+
+    if fmt is None or len(fmt) < 16:
+        raise ValueError(f"'{filename}' has no valid fmt chunk")
+
+    format_tag = int.from_bytes(fmt[0:2], "little")
+    if format_tag == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+        # The format tag is the first two bytes of the sub format GUID
+        format_tag = int.from_bytes(fmt[24:26], "little")
+
+    channels = int.from_bytes(fmt[2:4], "little")
+    sample_rate = int.from_bytes(fmt[4:8], "little")
+    sample_width = int.from_bytes(fmt[14:16], "little") // 8
+    if (format_tag, sample_width) not in SUPPORTED_FORMATS or not channels:
+        raise ValueError(f"Unsupported WAV format in '{filename}': {format_tag = }, {sample_width = }")
+
+    n_frames = data_size // (channels * sample_width)
+    return WavInfo(format_tag, channels, sample_rate, sample_width, data_offset, n_frames)
+
+
+def memmap_wav(filename: Union[str, Path]) -> Tuple[np.memmap, WavInfo]:
+    """Memory-map the sample data of a WAV file.
+
+    :param filename: Path to the WAV file.
+    :returns: Tuple of (samples, layout). The samples have shape (frames, channels), except
+        for 24-bit files, where they have shape (frames, channels, 3) of little-endian bytes.
+    """
+    info = read_wav_info(filename)
+    shape = (info.n_frames, info.channels)
+    if info.sample_width == 3:
+        dtype, shape = np.uint8, shape + (3,)
+    elif info.format_tag == WAVE_FORMAT_IEEE_FLOAT:
+        dtype = f"<f{info.sample_width}"
+    else:
+        dtype = "u1" if info.sample_width == 1 else f"<i{info.sample_width}"
+
+    if not info.n_frames:
+        return np.empty(shape, dtype=dtype), info
+
+    return np.memmap(filename, dtype=dtype, mode="r", offset=info.data_offset, shape=shape), info
+
+
+def to_int(samples: np.ndarray, info: WavInfo) -> np.ndarray:
+    """Convert raw integer samples to signed integers.
+
+    :param samples: Slice of the samples returned by `memmap_wav`.
+    :param info: Layout of the sample data.
+    :returns: Array of shape (frames, channels) of `int32` samples. 8-bit samples, which are
+        stored unsigned, are shifted to the range [-128, 127].
+    """
+    if info.sample_width == 1:
+        return samples.astype(np.int32) - 128
+    elif info.sample_width == 3:
+        # Place the three bytes in the upper bytes of an int32, and shift back with sign extension
+        padded = np.zeros(samples.shape[:2] + (4,), dtype=np.uint8)
+        padded[..., 1:] = samples
+        return padded.view("<i4")[..., 0] >> 8
+
+    return samples.astype(np.int32, copy=False)
+
+
+def to_float(samples: np.ndarray, info: WavInfo) -> np.ndarray:
+    """Convert raw samples to `float32` in the range [-1, 1).
+
+    :param samples: Slice of the samples returned by `memmap_wav`.
+    :param info: Layout of the sample data.
+    :returns: Array of shape (frames, channels) of `float32` samples.
+    """
+    if info.format_tag == WAVE_FORMAT_IEEE_FLOAT:
+        return samples.astype(np.float32)
+
+    return (to_int(samples, info) * np.float32(2.0 ** (1 - 8 * info.sample_width))).astype(np.float32)
+
+
+def float_chunks(
+    filename: Union[str, Path],
+    chunk_frames: int = CHUNK_FRAMES,
+    mono: bool = True
+) -> Iterator[np.ndarray]:
+    """Stream the samples of a WAV file as `float32` chunks.
+
+    :param filename: Path to the WAV file.
+    :param chunk_frames: Number of frames per chunk.
+    :param mono: Whether to average the channels into one.
+    :yields: Arrays of shape (frames,) if `mono`, otherwise (frames, channels).
+    """
+    samples, info = memmap_wav(filename)
+    for start in range(0, info.n_frames, chunk_frames):
+        chunk = to_float(samples[start:start + chunk_frames], info)
+        yield chunk.mean(axis=1, dtype=np.float32) if mono else chunk
+
+
+def memmap_wav_bytes(filename: Union[str, Path]) -> Tuple[np.ndarray, WavInfo]:
+    """Memory-map the sample data of a WAV file as raw little-endian bytes.
+
+    :param filename: Path to the WAV file.
+    :returns: Tuple of (samples of shape (frames, channels, sample width) as `uint8`, layout).
+        Byte 0 of each sample holds its least significant bits.
+    """
+    info = read_wav_info(filename)
+    shape = (info.n_frames, info.channels, info.sample_width)
+    if not info.n_frames:
+        return np.empty(shape, dtype=np.uint8), info
+
+    return np.memmap(filename, dtype=np.uint8, mode="r", offset=info.data_offset, shape=shape), info
+
+
+def wav_lsb_bits(
+    filename: Union[str, Path],
+    channel: Optional[int] = 0,
+    bit: int = 0,
+    start: int = 0,
+    stop: Optional[int] = None,
+    chunk_frames: int = CHUNK_FRAMES
+) -> Iterator[np.ndarray]:
+    """Stream one bit plane of the samples of a WAV file. Bits are read straight from the
+    memory-mapped sample bytes, without converting the samples.
+
+    :param filename: Path to the WAV file.
+    :param channel: Which channel to read, or `None` to read all channels interleaved
+        frame by frame, ex. left, right, left, right, ...
+    :param bit: Bit plane to read, where 0 is the least significant bit.
+    :param start: Index of the first bit to read.
+    :param stop: Index to stop reading at. Reads to the end of the file by default.
+    :param chunk_frames: Number of frames to read per chunk.
+    :raises ValueError: If `channel` or `bit` does not exist in the file.
+    :yields: Arrays of `uint8` bits.
+    """
+    samples, info = memmap_wav_bytes(filename)
+    if channel is not None and not 0 <= channel < info.channels:
+        raise ValueError(f"The file only has {info.channels} channel(s), cannot read channel '{channel}'.")
+    elif not 0 <= bit < 8 * info.sample_width:
+        raise ValueError(f"The file has {8 * info.sample_width} bits per sample, cannot read bit '{bit}'.")
+
+    plane = samples[:, :, bit // 8] if channel is None else samples[:, channel:channel + 1, bit // 8]
+    bits_per_frame = plane.shape[1]
+    total = info.n_frames * bits_per_frame
+    start, stop = min(max(start, 0), total), min(total if stop is None else stop, total)
+
+    for first in range(start // bits_per_frame * bits_per_frame, stop, chunk_frames * bits_per_frame):
+        frame = first // bits_per_frame
+        chunk = (plane[frame:frame + chunk_frames].ravel() >> (bit % 8)) & 1
+        yield chunk[max(start - first, 0):stop - first]
+
+
+def read_wav_lsb_data(
+    filename: Union[str, Path],
+    channel: Optional[int] = 0,
+    bit: int = 0,
+    start: int = 0,
+    stop: Optional[int] = None
+) -> Tuple[bytes, int]:
+    """Read one bit plane of the samples of a WAV file as packed bits, which can be decoded
+    with `utils.utils.lsb_bits_to_string`, ex:
+
+        data, bit_count = read_wav_lsb_data("song.wav")
+        lsb_bits_to_string(data, bit_count=bit_count)
+
+    :param filename: Path to the WAV file.
+    :param channel: Which channel to read, or `None` to read all channels interleaved.
+    :param bit: Bit plane to read, where 0 is the least significant bit.
+    :param start: Index of the first bit to read.
+    :param stop: Index to stop reading at. Reads to the end of the file by default.
+    :returns: Tuple of (packed bits, most significant bit first, number of bits).
+    """
+    packed = []
+    carry = np.empty(0, dtype=np.uint8)
+    bit_count = 0
+    for bits in wav_lsb_bits(filename, channel=channel, bit=bit, start=start, stop=stop):
+        bit_count += len(bits)
+        bits = np.concatenate((carry, bits))
+        full = len(bits) // 8 * 8
+        packed.append(np.packbits(bits[:full]).tobytes())
+        carry = bits[full:]
+
+    packed.append(np.packbits(carry).tobytes())
+    return b"".join(packed), bit_count